@@ -0,0 +1,37 @@
+"""
+Compares preprocessing a stacked (N, H, W, C) array of images against the
+per-image loop
+
+Usage: python benchmarks/bench_image_preprocess.py [number of images]
+"""
+import sys, timeit
+
+import numpy as np
+
+from indicoio.utils.image import image_preprocess
+
+
+def per_image(images, size):
+    if images.shape[-1] == 1:
+        images = images[..., 0]
+    return [image_preprocess(image, size=size) for image in images]
+
+
+def stacked(images, size):
+    return image_preprocess(images, size=size, batch=True)
+
+
+def main(n=2000):
+    cases = [
+        ("facial_features 48x48, uint8 greyscale", np.random.randint(0, 255, (n, 96, 96, 1)).astype("uint8"), (48, 48)),
+        ("image_features 64x64, float rgb", np.random.random((n, 128, 128, 3)), (64, 64)),
+    ]
+    for name, images, size in cases:
+        print name
+        for label, f in (("per image", per_image), ("stacked", stacked)):
+            seconds = min(timeit.repeat(lambda: f(images, size), number=1, repeat=3))
+            print "    %-10s %8.3fs  %8.0f images/s" % (label, seconds, n / seconds)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
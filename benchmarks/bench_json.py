@@ -0,0 +1,43 @@
+"""
+Compares the installed json backends encoding typical request batches and
+decoding typical responses
+
+Usage: python benchmarks/bench_json.py [batch size]
+"""
+import base64, os, random, sys, timeit
+
+from indicoio.utils.errors import IndicoError
+from indicoio.utils.serializer import BACKENDS, serializer
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def main(n=1000):
+    with open(os.path.join(DIR, "..", "tests", "data", "fear.png"), "rb") as f:
+        image = base64.b64encode(f.read())
+    text = "Monday: Delightful with mostly sunny skies. Highs in the low 70s. "
+    cases = [
+        ("encode %d texts" % n, "dumps", [text * 4] * n),
+        ("encode %d images" % n, "dumps", [image] * n),
+        ("decode %d sentiment results" % n, "loads", {"results": [random.random() for _ in xrange(n)]}),
+        ("decode %d image_features results" % n, "loads",
+            {"results": [[random.random() for _ in xrange(2048)] for _ in xrange(n)]}),
+    ]
+    backends = []
+    for name in BACKENDS:
+        try:
+            backends.append(serializer(name))
+        except IndicoError:
+            print "%s is not installed" % name
+
+    for label, method, data in cases:
+        print label
+        encoded = serializer("json")[1](data)
+        for name, dumps, loads in backends:
+            f = (lambda: dumps(data)) if method == "dumps" else (lambda: loads(encoded))
+            seconds = min(timeit.repeat(f, number=1, repeat=3))
+            print "    %-10s %8.3fs  %8.1f MB/s" % (name, seconds, len(encoded) / seconds / 1e6)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
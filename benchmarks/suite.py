@@ -0,0 +1,173 @@
+"""
+Benchmarks of the client's hot paths: image preprocessing, url building,
+json encoding and decoding, response parsing and whole calls against the
+local mock server. Results can be saved and compared with an earlier run,
+e.g. of another version.
+
+Usage:
+    python benchmarks/suite.py [-k substring] [--save results.json] [--compare results.json]
+"""
+import argparse, base64, json, os, platform, sys, tempfile, time, timeit
+from collections import OrderedDict
+from functools import partial
+
+import numpy as np
+from PIL import Image
+
+import indicoio
+from indicoio import sentiment
+from indicoio.utils.api import create_url
+from indicoio.utils.image import image_preprocess, resize_image
+from indicoio.utils.mockserver import MockServer
+from indicoio.utils.multi import handle_response
+from indicoio.utils.serializer import serializer
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """
+    Registers a function returning the callable to time as `name`
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def time_call(f, min_time=0.2, repeat=3):
+    """
+    Best time in seconds of a call to `f`, each measurement running it
+    enough times to take at least `min_time` seconds
+    """
+    number = 1
+    while timeit.timeit(f, number=number) < min_time and number < 1e6:
+        number *= 2
+    return min(timeit.repeat(f, number=number, repeat=repeat)) / number
+
+
+def sample_image(size=(256, 256)):
+    rng = np.random.RandomState(0)
+    return Image.fromarray(rng.randint(0, 255, size[::-1] + (3,)).astype("uint8"))
+
+
+def save(image):
+    path = os.path.join(tempfile.gettempdir(), "indicoio_benchmark.png")
+    image.save(path)
+    return path
+
+
+def preprocess_one(make):
+    image = make()
+    return lambda: image_preprocess(image, size=(48, 48))
+
+
+for label, make in [
+    ("path", lambda: save(sample_image())),
+    ("base64", lambda: base64.b64encode(open(save(sample_image()), "rb").read())),
+    ("PIL", sample_image),
+    ("ndarray uint8", lambda: np.asarray(sample_image())),
+    ("ndarray float", lambda: np.asarray(sample_image()) / 255.),
+]:
+    benchmark("image_preprocess %s 256x256 -> 48x48" % label)(partial(preprocess_one, make))
+
+
+@benchmark("image_preprocess ndarray batch of 100 256x256 -> 48x48")
+def stacked_batch():
+    images = np.asarray([np.asarray(sample_image())] * 100)
+    return lambda: image_preprocess(images, size=(48, 48), batch=True)
+
+
+@benchmark("resize_image 1024x768 min_axis=128")
+def resize():
+    image = sample_image((1024, 768))
+    return lambda: resize_image(image, None, 128)
+
+
+@benchmark("create_url multiapi")
+def url():
+    params = {"batch": True, "api_key": "key", "apis": ["sentiment", "political", "text_tags"]}
+    return lambda: create_url("apiv2.indico.io", "apis/multiapi", params)
+
+
+def json_payloads():
+    with open(os.path.join(DIR, "..", "tests", "data", "fear.png"), "rb") as f:
+        image = base64.b64encode(f.read())
+    texts = ["Monday: Delightful with mostly sunny skies. Highs in the low 70s."] * 1000
+    features = json.dumps({"results": [[0.5] * 2048] * 100})
+    return texts, [image] * 100, features
+
+
+def json_benchmark(backend, operation, payload):
+    _, dumps, loads = serializer(backend)
+    data = json_payloads()[payload]
+    return lambda: dumps(data) if operation == "encode" else loads(data)
+
+
+for backend in sorted(set(["json", serializer()[0]])):
+    for operation, payload, label in [
+        ("encode", 0, "1000 texts"), ("encode", 1, "100 images"), ("decode", 2, "100 image_features")
+    ]:
+        benchmark("json %s %s %s" % (backend, operation, label))(
+            partial(json_benchmark, backend, operation, payload)
+        )
+
+
+@benchmark("handle_response 4 apis x 1000 items")
+def responses():
+    result = dict(
+        (api, {"results": [{"label": 0.5}] * 1000})
+        for api in ["sentiment", "political", "text_tags", "language"]
+    )
+    return lambda: handle_response(result)
+
+
+def end_to_end(size, workers):
+    texts = ["text %d" % i for i in range(size)]
+    return lambda: sentiment(texts, api_key="key", chunk_size=100, max_workers=workers)
+
+
+for size in (1, 100, 1000):
+    for workers in (1, 4):
+        benchmark("sentiment batch of %d, max_workers=%d, mock server" % (size, workers))(
+            partial(end_to_end, size, workers)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="match", default="", help="only run benchmarks containing this")
+    parser.add_argument("--save", help="file to save the results to")
+    parser.add_argument("--compare", help="results file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+
+    results = OrderedDict()
+    with MockServer():
+        for name, setup in BENCHMARKS.items():
+            if args.match not in name:
+                continue
+            results[name] = seconds = time_call(setup())
+            line = "%-60s %12.1fus" % (name, seconds * 1e6)
+            if name in previous:
+                line += "  %5.2fx" % (previous[name] / seconds)
+            print line
+            sys.stdout.flush()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "version": indicoio.__version__,
+                "python": platform.python_version(),
+                "time": time.time(),
+                "results": results,
+            }, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
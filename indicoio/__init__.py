@@ -6,6 +6,7 @@ Version, version, __version__, VERSION = ('0.9.2',) * 4
 JSON_HEADERS = {
     'Content-type': 'application/json',
     'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate',
     'client-lib': 'python',
     'version-number': VERSION
 }
@@ -23,8 +24,11 @@ from indicoio.images.faciallocalization import facial_localization
 from indicoio.images.features import image_features
 from indicoio.images.filtering import content_filtering
 from indicoio.utils.multi import analyze_image, analyze_text, intersections
+from indicoio.utils.session import set_session, close_sessions
+from indicoio.utils.stream import stream
 
 from indicoio.config import API_NAMES
+from indicoio.utils.image import is_stacked_array
 
 def deprecation_decorator(f, api):
     @wraps(f)
@@ -39,7 +43,7 @@ def deprecation_decorator(f, api):
 def detect_batch_decorator(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        if isinstance(args[0], list):
+        if isinstance(args[0], list) or is_stacked_array(args[0]):
             kwargs['batch'] = True
         return f(*args, **kwargs)
     return wrapper
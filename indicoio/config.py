@@ -1,8 +1,10 @@
-import os
+import os, warnings
 from StringIO import StringIO
 
 import ConfigParser
 
+from indicoio.utils.retry import RetryPolicy
+
 class Settings(ConfigParser.ConfigParser):
 
     def __init__(self, *args, **kwargs):
@@ -21,6 +23,7 @@ class Settings(ConfigParser.ConfigParser):
 
         self.auth_settings = self.get_section('auth')
         self.private_cloud_settings = self.get_section('private_cloud')
+        self.connection_settings = self.get_section('connection')
 
     def get_section(self, section):
         """
@@ -45,6 +48,50 @@ class Settings(ConfigParser.ConfigParser):
             None
         )
 
+    def number(self, name, convert, default, allow_none=False):
+        """
+        Reads the numeric setting `name` from INDICO_<NAME> or the
+        [connection] section. Values that cannot be read fall back to
+        `default` with a warning, and "none" gives None when `allow_none`.
+        """
+        value = os.getenv("INDICO_%s" % name.upper()) or self.connection_settings.get(name)
+        if not value:
+            return default
+        if allow_none and value.strip().lower() == "none":
+            return None
+        try:
+            return convert(value)
+        except ValueError:
+            warnings.warn("Ignoring invalid %s setting %r, using %r" % (name, value, default))
+            return default
+
+    def timeout(self):
+        """
+        (connect, read) timeouts in seconds, each defaulting to DEFAULT_TIMEOUT.
+        "none" waits without limit.
+        """
+        return tuple(
+            self.number('%s_timeout' % kind, float, default, allow_none=True)
+            for kind, default in zip(('connect', 'read'), DEFAULT_TIMEOUT)
+        )
+
+    def compression(self):
+        """
+        Whether to gzip request bodies, the size in bytes from which they are
+        compressed and the compression level, defaulting to DEFAULT_COMPRESSION
+        """
+        compress = (
+            os.getenv("INDICO_COMPRESS") or self.connection_settings.get('compress') or "false"
+        ).lower() in ("1", "true", "yes", "on")
+        threshold, level = (
+            self.number(name, int, default)
+            for name, default in zip(('compress_threshold', 'compress_level'), DEFAULT_COMPRESSION)
+        )
+        return compress, threshold, level
+
+DEFAULT_TIMEOUT = (10, 120)
+DEFAULT_COMPRESSION = (1024, 6)
+
 TEXT_APIS = [
     'text_tags',
     'political',
@@ -78,5 +125,42 @@ SETTINGS = Settings(files=[
 
 api_key = SETTINGS.api_key()
 cloud = SETTINGS.cloud()
+timeout = SETTINGS.timeout()
+compress, compress_threshold, compress_level = SETTINGS.compression()
 PUBLIC_API_HOST = 'apiv2.indico.io'
 url_protocol = "https:"
+
+# connection pooling
+pool_size = 10
+keep_alive = True
+
+# batch requests are split into chunks no larger than these limits
+chunk_size = 1000
+max_chunk_bytes = 8 * 1024 * 1024
+# number of chunks of a batch request sent concurrently
+max_workers = 1
+# number of calls made through `indicoio.futures` that may run at once
+concurrency = 10
+# response cache used by every api, see `indicoio.utils.cache`
+cache = None
+# send repeated items of a batch request only once
+deduplicate = True
+# retry policy for failed requests, None or False disables retries
+retry = RetryPolicy()
+# limits the rate requests are sent at, see `indicoio.utils.ratelimit.RateLimiter`
+rate_limiter = None
+# overall time limit in seconds for each api call, including every chunk of a batch
+deadline = None
+# number of threads (or processes) used to preprocess batches of images
+preprocess_workers = 1
+preprocess_processes = False
+# format images are sent in: PNG, or JPEG / WEBP at the given quality
+image_encoding = 'PNG'
+image_quality = 90
+# cache of preprocessed images, see `indicoio.utils.cache`
+image_cache = None
+# json library to use, one of orjson, ujson, rapidjson or json (default: fastest installed)
+json_backend = None
+# how analyze_text and analyze_image request several apis: "multiapi",
+# "fanout" (one concurrent request per api) or "auto", see utils.multi
+multi_policy = "multiapi"
@@ -0,0 +1,65 @@
+"""
+Non-blocking versions of every indico API
+
+Each function accepts the same arguments as its counterpart in `indicoio`
+and returns immediately with a `multiprocessing.pool.AsyncResult`. Calls run
+on a shared pool of `config.concurrency` threads, which bounds the number of
+requests in flight, and reuse the pooled HTTP sessions.
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio import futures
+   >>> pending = [futures.sentiment(text) for text in texts]
+   >>> scores = [result.get() for result in pending]
+"""
+import threading
+from functools import wraps
+from multiprocessing.pool import ThreadPool
+
+import indicoio
+from indicoio import config
+from indicoio.config import API_NAMES
+
+_POOL = None
+_LOCK = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the shared worker pool, creating it on first use
+    """
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ThreadPool(config.concurrency)
+    return _POOL
+
+
+def close_pool():
+    """
+    Waits for pending calls to finish and shuts down the worker pool
+    """
+    global _POOL
+    with _LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+
+def nonblocking(f):
+    """
+    Wraps an api function to run on the shared pool. An optional `callback`
+    keyword argument is called with the result when the call succeeds.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        callback = kwargs.pop('callback', None)
+        return get_pool().apply_async(f, args, kwargs, callback)
+    return wrapper
+
+
+for api in API_NAMES:
+    globals()[api] = nonblocking(getattr(indicoio, api))
@@ -1,6 +1,6 @@
 import requests
 
-from indicoio.utils.image import image_preprocess
+from indicoio.utils.image import image_preprocess, preprocess_options
 from indicoio.utils.api import api_handler
 
 
@@ -26,6 +26,6 @@ def facial_localization(image, cloud=None, batch=False, api_key=None, **kwargs):
     :type image: filepath or ndarray
     :rtype: List of faces (dict) found. 
     """
-    image = image_preprocess(image, batch=batch)
+    image = image_preprocess(image, batch=batch, **preprocess_options(kwargs))
     url_params = {"batch": batch, "api_key": api_key}
     return api_handler(image, cloud=cloud, api="faciallocalization", url_params=url_params, **kwargs)
\ No newline at end of file
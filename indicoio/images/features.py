@@ -1,6 +1,6 @@
 import requests
 
-from indicoio.utils.image import image_preprocess
+from indicoio.utils.image import image_preprocess, preprocess_options
 from indicoio.utils.api import api_handler
 
 def facial_features(image, cloud=None, batch=False, api_key=None, **kwargs):
@@ -21,11 +21,13 @@ def facial_features(image, cloud=None, batch=False, api_key=None, **kwargs):
        >>> len(features)
        48
 
+    Pass `as_array=True` for the features as a float32 numpy array.
+
     :param image: The image to be analyzed.
     :type image: list of lists
     :rtype: List containing feature responses
     """
-    image = image_preprocess(image, batch=batch, size=(48,48))
+    image = image_preprocess(image, batch=batch, size=(48,48), **preprocess_options(kwargs))
     url_params = {"batch": batch, "api_key": api_key}
     return api_handler(image, cloud=cloud, api="facialfeatures", url_params=url_params, **kwargs)
 
@@ -55,10 +57,13 @@ def image_features(image, cloud=None, batch=False, api_key=None, **kwargs):
 
     For image similarity, simple distance metrics applied to collections of image feature vectors can work very well.
 
+    Pass `as_array=True` for the features as a float32 numpy array of shape (number of images, 2048),
+    or `as_array="sparse"` for a scipy sparse matrix.
+
     :param image: The image to be analyzed.
     :type image: numpy.ndarray
     :rtype: List containing features
     """
-    image = image_preprocess(image, batch=batch, size=(64,64))
+    image = image_preprocess(image, batch=batch, size=(64,64), **preprocess_options(kwargs))
     url_params = {"batch": batch, "api_key": api_key}
     return api_handler(image, cloud=cloud, api="imagefeatures", url_params=url_params, **kwargs)
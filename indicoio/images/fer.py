@@ -1,7 +1,7 @@
 import requests
 
 from indicoio.utils.api import api_handler
-from indicoio.utils.image import image_preprocess
+from indicoio.utils.image import image_preprocess, preprocess_options
 import indicoio.config as config
 
 def fer(image, cloud=None, batch=False, api_key=None, **kwargs):
@@ -29,7 +29,8 @@ def fer(image, cloud=None, batch=False, api_key=None, **kwargs):
     """
 
     image = image_preprocess(image, batch=batch,
-        size=None if kwargs.get("detect") else (48, 48)
+        size=None if kwargs.get("detect") else (48, 48),
+        **preprocess_options(kwargs)
     )
     
     url_params = {"batch": batch, "api_key": api_key}
@@ -1,7 +1,7 @@
 import requests
 
 from indicoio.utils.api import api_handler
-from indicoio.utils.image import image_preprocess
+from indicoio.utils.image import image_preprocess, preprocess_options
 import indicoio.config as config
 
 def content_filtering(image, cloud=None, batch=False, api_key=None, **kwargs):
@@ -24,6 +24,6 @@ def content_filtering(image, cloud=None, batch=False, api_key=None, **kwargs):
     :type image: list of lists
     :rtype: float of nsfwness
     """
-    image = image_preprocess(image, batch=batch, min_axis=128)
+    image = image_preprocess(image, batch=batch, min_axis=128, **preprocess_options(kwargs))
     url_params = {"batch": batch, "api_key": api_key}
     return api_handler(image, cloud=cloud, api="contentfiltering", url_params=url_params, **kwargs)
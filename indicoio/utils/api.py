@@ -2,29 +2,262 @@
 Handles making requests to the IndicoApi Server
 """
 
-import json, requests
+import copy, json, hashlib, time, zlib
+from itertools import chain
 
-from indicoio.utils.errors import IndicoError, DataStructureException
+from indicoio.utils.errors import IndicoError, BatchError, DeadlineExceeded, DataStructureException
+from indicoio.utils.session import api_host, get_session
+from indicoio.utils.concurrency import imap_ordered
+from indicoio.utils.metrics import COUNTERS
+from indicoio.utils.retry import NO_RETRY
+from indicoio.utils.serializer import dumps, loads
+from indicoio.utils.formats import result_format
+from indicoio.utils import hooks
 from indicoio import JSON_HEADERS
 from indicoio import config
 
 def api_handler(arg, cloud, api, url_params=None, **kwargs):
     """
     Sends finalized request data to ML server and receives response.
+    Batch requests are split into chunks of at most `chunk_size` items and
+    `max_chunk_bytes` bytes of serialized data, which are sent separately,
+    up to `max_workers` at a time, and reassembled in order.
+
+    A `deadline` in seconds bounds the whole call: chunks not completed in
+    time fail with `DeadlineExceeded`, and the results of the others are
+    available from the `BatchError` raised.
+
+    When a `cache` is given (or set as `config.cache`), results are looked
+    up there first and only cache misses are sent to the server. Unless
+    `deduplicate` is disabled, repeated items of a batch are only sent once.
+
+    Feature vector results are returned as a float32 numpy array with
+    `as_array=True`, or a scipy sparse matrix with `as_array="sparse"`.
+    Batches of dictionaries can be returned as columns with `columnar`, see
+    `indicoio.utils.columns`. Both are converted as the results of each
+    request arrive.
     """
+    session = kwargs.pop('session', None)
+    chunk_size = kwargs.pop('chunk_size', None) or config.chunk_size
+    max_chunk_bytes = kwargs.pop('max_chunk_bytes', None) or config.max_chunk_bytes
+    max_workers = kwargs.pop('max_workers', None) or config.max_workers
+    cache = kwargs.pop('cache', None)
+    cache = config.cache if cache is None else cache
+    deduplicate = kwargs.pop('deduplicate', None)
+    deduplicate = config.deduplicate if deduplicate is None else deduplicate
+    fmt = result_format(kwargs.pop('as_array', False), kwargs.pop('columnar', False), api)
+    options = request_options(kwargs)
 
-    data = {'data': arg}
-    data.update(**kwargs)
-    json_data = json.dumps(data)
     cloud = cloud or config.cloud
-    host = "%s.indico.domains" % cloud if cloud else config.PUBLIC_API_HOST
+    host = api_host(cloud)
     url = create_url(host, api, url_params)
-    response = requests.post(url, data=json_data, headers=JSON_HEADERS)
+    session = session or get_session(host)
+    multi = bool(url_params.get("apis"))
+    if fmt and multi:
+        raise IndicoError("as_array and columnar cannot be used with multiple apis")
+    signature = request_signature(api, cloud, url_params, kwargs)
+    send = lambda json_arg, items=1, encode_seconds=0: send_request(
+        session, url, json_arg, cloud, api, kwargs, options, items, encode_seconds
+    )
+
+    if not url_params.get("batch"):
+        start = time.time()
+        json_arg = dumps(arg)
+        encode_seconds = time.time() - start
+        if not cache:
+            results = send(json_arg, encode_seconds=encode_seconds)
+        else:
+            # multi api results are cached per item as {api: result}, the
+            # same shape as batch items, since both share a key
+            key = cache_key(signature, json_arg)
+            results = cache.get(key)
+            if results is None:
+                results = send(json_arg, encode_seconds=encode_seconds)
+                if not multi:
+                    cache.set(key, results)
+                elif all('results' in r for r in results.values()):
+                    cache.set(key, dict((name, r['results']) for name, r in results.items()))
+            else:
+                COUNTERS.incr("cache_hits", api=api, cloud=cloud or "")
+                if multi:
+                    results = dict((name, {'results': result}) for name, result in results.items())
+        return fmt.single(results) if fmt else results
+
+    hits, duplicates, seen, sent = {}, {}, {}, []
+    encoding = [0.0]  # seconds spent encoding items not yet attributed to a chunk
+    def unsent():
+        for index, item in enumerate(arg):
+            start = time.time()
+            encoded = dumps(item)
+            encoding[0] += time.time() - start
+            if cache or deduplicate:
+                key = cache_key(signature, encoded)
+                if key in seen:
+                    duplicates[index] = seen[key]
+                    continue
+                if deduplicate:
+                    seen[key] = index
+                cached = cache.get(key) if cache else None
+                if cached is not None:
+                    hits[index] = cached
+                    continue
+                sent.append((index, key))
+            yield index, encoded
+
+    def send_chunk(chunk):
+        encode_seconds, encoding[0] = encoding[0], 0.0
+        return send("[%s]" % ",".join(encoded for _, encoded in chunk), len(chunk), encode_seconds)
+
+    chunks = chunk_batch(unsent(), chunk_size, max_chunk_bytes)
+
+    results, errors, failed = [], {}, {}
+    for chunk, result, error in imap_ordered(send_chunk, chunks, max_workers):
+        if error is not None:
+            errors[(chunk[0][0], chunk[-1][0] + 1)] = error
+            failed[(chunk[0][0], chunk[-1][0] + 1)] = [index for index, _ in chunk]
+        elif fmt:
+            result = fmt.convert(result)
+        results.append((len(chunk), result))
+    COUNTERS.incr("duplicates", len(duplicates), api=api, cloud=cloud or "")
+    COUNTERS.incr("cache_hits", len(hits), api=api, cloud=cloud or "")
+
+    if not results and not hits:
+        results = send("[]")
+        return fmt.finish(fmt.convert(results)) if fmt else results
+    if errors and len(results) == 1 and not hits:
+        raise errors.values()[0]
+
+    cache = None if errors else cache
+    if fmt:
+        results = fmt.join(results) if results else None
+        if hits or duplicates or cache:
+            results = fmt.expand(results, sent, hits, duplicates, len(arg), cache)
+        results = fmt.finish(results)
+    else:
+        results = join_results(results) if results else None
+        if hits or duplicates or cache:
+            results = expand_results(results, sent, hits, duplicates, len(arg), multi, cache)
+    if errors:
+        raise BatchError(errors, results, failed_indices(failed, duplicates))
+    return results
+
+
+def request_options(kwargs):
+    """
+    Pops the options controlling how each request is sent from `kwargs`,
+    falling back to the defaults in `config`. `deadline` is converted from
+    seconds to an absolute time.
+    """
+    options = {}
+    for option in ('retry', 'rate_limiter', 'timeout', 'deadline',
+                   'compress', 'compress_threshold', 'compress_level'):
+        value = kwargs.pop(option, None)
+        options[option] = getattr(config, option) if value is None else value
+    options['retry'] = options['retry'] or NO_RETRY
+    if options['deadline']:
+        options['deadline'] = time.time() + options['deadline']
+    return options
+
 
-    if response.status_code == 503 and cloud != None:
-        raise IndicoError("Private cloud '%s' does not include api '%s'" % (cloud, api))
-    
-    json_results = response.json()
+def send_request(session, url, json_arg, cloud, api, kwargs, options, items=1, encode_seconds=0):
+    """
+    Posts already serialized data along with any extra request arguments.
+
+    Connection errors and retryable status codes are retried as set out by
+    the `retry` policy, and every attempt first waits for the
+    `rate_limiter`, if any, to allow a request of `items` items. Requests
+    use the (connect, read) `timeout`, shortened so that no attempt runs
+    past the `deadline`. With `compress` set, bodies of at least
+    `compress_threshold` bytes are gzipped at `compress_level`.
+
+    The request_start, retry, response and error hooks are called along the
+    way, see `indicoio.utils.hooks`.
+    """
+    info = {'api': api, 'cloud': cloud, 'url': url}
+
+    json_data = '{"data": %s' % json_arg
+    if kwargs:
+        json_data += ", " + dumps(kwargs)[1:]
+    else:
+        json_data += "}"
+
+    headers = JSON_HEADERS
+    if options['compress'] and len(json_data) >= options['compress_threshold']:
+        json_data = gzip_compress(json_data, options['compress_level'])
+        headers = dict(JSON_HEADERS, **{'Content-Encoding': 'gzip'})
+
+    hooks.emit('request_start', items=items, bytes_sent=len(json_data),
+               encode_seconds=encode_seconds, **info)
+    try:
+        response, attempts, network_seconds = post(session, json_data, headers, items, options, info)
+        start = time.time()
+        results = parse_response(response, api)
+    except Exception as e:
+        hooks.emit('error', items=items, error=e, **info)
+        raise
+    hooks.emit('response', items=items, status_code=response.status_code,
+               bytes_received=len(response.content), attempts=attempts,
+               network_seconds=network_seconds, decode_seconds=time.time() - start, **info)
+    return results
+
+
+def post(session, json_data, headers, items, options, info):
+    """
+    Posts `json_data`, retrying as set out in `send_request`. Returns the
+    final response, the number of attempts made and the seconds spent
+    waiting on the network.
+    """
+    retry, rate_limiter, deadline = options['retry'], options['rate_limiter'], options['deadline']
+    should_retry = lambda attempt, delay: attempt + 1 < retry.max_attempts and (
+        not deadline or time.time() + delay < deadline
+    )
+    api, cloud = info['api'], info['cloud']
+
+    attempt, network_seconds = 0, 0
+    while True:
+        if rate_limiter:
+            rate_limiter.acquire(items)
+        timeout = options['timeout']
+        if deadline:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise DeadlineExceeded("The %s API request did not complete before its deadline" % api)
+            timeout = clip_timeout(timeout, remaining)
+        start = time.time()
+        try:
+            response = session.post(info['url'], data=json_data, headers=headers, timeout=timeout)
+        except retry.exceptions as e:
+            network_seconds += time.time() - start
+            if deadline and time.time() >= deadline:
+                raise DeadlineExceeded("The %s API request did not complete before its deadline" % api)
+            delay = retry.delay(attempt)
+            if not should_retry(attempt, delay):
+                raise
+            failure = {'error': e}
+        else:
+            network_seconds += time.time() - start
+            if response.status_code == 503 and cloud != None:
+                raise IndicoError("Private cloud '%s' does not include api '%s'" % (cloud, api))
+            if not retry.retry_status(response):
+                break
+            delay = retry.delay(attempt, response)
+            if not should_retry(attempt, delay):
+                break
+            failure = {'status_code': response.status_code}
+        COUNTERS.incr("retries", api=api, cloud=cloud or "")
+        hooks.emit('retry', attempt=attempt + 1, delay=delay, **dict(info, **failure))
+        time.sleep(delay)
+        attempt += 1
+    return response, attempt + 1, network_seconds
+
+
+def parse_response(response, api):
+    try:
+        json_results = loads(response.content)
+    except ValueError:
+        raise IndicoError(
+            "The %s API returned an invalid response (status %d)" % (api, response.status_code)
+        )
     results = json_results.get('results', False)
     if results is False:
         error = json_results.get('error')
@@ -32,6 +265,124 @@ def api_handler(arg, cloud, api, url_params=None, **kwargs):
     return results
 
 
+def gzip_compress(data, level):
+    if isinstance(data, unicode):
+        data = data.encode("utf-8")
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def clip_timeout(timeout, remaining):
+    """
+    Shortens a timeout, given in seconds or as a (connect, read) pair, to at
+    most `remaining` seconds
+    """
+    if isinstance(timeout, (tuple, list)):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def chunk_batch(items, chunk_size, max_chunk_bytes):
+    """
+    Groups (index, serialized item) pairs into chunks, starting a new chunk
+    whenever the item count or byte size limit would be exceeded. A single
+    item larger than `max_chunk_bytes` is sent on its own.
+    """
+    chunk, chunk_bytes = [], 0
+    for index, encoded in items:
+        if chunk and (len(chunk) >= chunk_size or chunk_bytes + len(encoded) > max_chunk_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append((index, encoded))
+        chunk_bytes += len(encoded) + 1
+    if chunk:
+        yield chunk
+
+
+def join_results(chunks):
+    """
+    Reassembles the (size, results) pairs of each chunk of a batch request.
+    Failed chunks have results of None and contribute None for each of their
+    items. Multi api results are joined per api, keeping the first error an
+    api returned.
+    """
+    sent = [results for _, results in chunks if results is not None]
+    if len(chunks) == 1 and sent:
+        return sent[0]
+
+    fill = lambda results, size: [None] * size if results is None else results
+    if sent and isinstance(sent[0], dict):
+        joined = {}
+        for api in sent[0]:
+            errors = [results[api] for results in sent if 'results' not in results[api]]
+            joined[api] = errors[0] if errors else {
+                'results': list(chain.from_iterable(
+                    fill(results and results[api]['results'], size)
+                    for size, results in chunks
+                ))
+            }
+        return joined
+
+    return list(chain.from_iterable(fill(results, size) for size, results in chunks))
+
+
+def expand_results(results, sent, hits, duplicates, size, multi, cache=None):
+    """
+    Places the results of the `sent` (index, key) items, the cached `hits`
+    and the `duplicates` (index: index of the first occurrence) at their
+    positions in the original batch of `size` items. Results of sent items
+    are stored in `cache` when one is given.
+
+    Multi api results are handled per item as a dictionary of api: result,
+    and items are only cached when every api succeeded.
+    """
+    errors = {}
+    if multi and results is not None:
+        errors = dict((api, response) for api, response in results.items() if 'results' not in response)
+        values = dict((api, response['results']) for api, response in results.items() if api not in errors)
+        results = [dict((api, values[api][i]) for api in values) for i in range(len(sent))]
+
+    items = dict(hits)
+    for (index, key), result in zip(sent, results or []):
+        items[index] = result
+        if cache and not errors and result is not None:
+            cache.set(key, result)
+    # repeats get their own copy, so changing one result leaves the others
+    items = [
+        copy.deepcopy(items.get(duplicates[index])) if index in duplicates else items.get(index)
+        for index in range(size)
+    ]
+
+    if not multi:
+        return items
+    joined = dict(errors)
+    for api in set(chain.from_iterable(item for item in items if item)) - set(errors):
+        joined[api] = {'results': [item and item.get(api) for item in items]}
+    return joined
+
+
+def failed_indices(failed, duplicates):
+    """
+    Adds the repeats of their items to the indices of each failed chunk
+    """
+    chunk_of = dict((index, chunk) for chunk, indices in failed.items() for index in indices)
+    for index, first in sorted(duplicates.items()):
+        if first in chunk_of:
+            failed[chunk_of[first]].append(index)
+    return failed
+
+
+def request_signature(api, cloud, url_params, kwargs):
+    """
+    Serializes everything besides the input data that affects a response
+    """
+    return json.dumps([api, cloud, url_params.get("apis"), kwargs], sort_keys=True)
+
+
+def cache_key(signature, encoded):
+    return hashlib.sha1(signature + "\n" + encoded).hexdigest()
+
+
 def create_url(host, api, url_params):
     api_key = url_params.get("api_key") or config.api_key
     is_batch = url_params.get("batch")
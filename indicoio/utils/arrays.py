@@ -0,0 +1,112 @@
+"""
+Feature vector results as numpy arrays, or scipy sparse matrices for the
+mostly zero `image_features`. The results of each request are converted as
+they arrive, so a batch never holds more than a chunk of them as Python
+floats.
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio import image_features
+   >>> features = image_features(images, batch=True, as_array=True)
+   >>> features.shape, features.dtype
+   ((1000, 2048), dtype('float32'))
+   >>> image_features(images, batch=True, as_array="sparse")
+   <1000x2048 sparse matrix of type '<type 'numpy.float32'>' ...>
+"""
+from indicoio.utils.errors import IndicoError
+
+ARRAY_MODES = (True, "sparse")
+# apis returning a feature vector per item
+ARRAY_APIS = ("facialfeatures", "imagefeatures")
+
+
+def numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise IndicoError("numpy must be installed to return results as arrays")
+    return numpy
+
+
+def scipy_sparse():
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise IndicoError("scipy must be installed to return results as sparse matrices")
+    return scipy.sparse
+
+
+def check_mode(mode, api=None):
+    if mode not in ARRAY_MODES:
+        raise IndicoError("as_array must be True or 'sparse', not %r" % (mode,))
+    if api is not None and api not in ARRAY_APIS:
+        raise IndicoError("as_array can only be used with image_features and facial_features")
+
+
+def to_array(results, mode=True, width=None):
+    """
+    Converts a feature vector, or a list of them, to a float32 array, or a
+    CSR matrix when `mode` is "sparse". An empty list becomes `width`
+    columns wide.
+    """
+    array = numpy().asarray(results, dtype="float32")
+    if not len(results) and width is not None:
+        array = array.reshape(0, width)
+    if mode == "sparse":
+        return scipy_sparse().csr_matrix(array)
+    return array
+
+
+def stack(arrays, mode):
+    if mode == "sparse":
+        return scipy_sparse().vstack(arrays, format="csr")
+    return numpy().concatenate(arrays)
+
+
+def join_arrays(chunks, mode=True):
+    """
+    Stacks the (size, array) results of each chunk of a batch request.
+    Failed chunks have results of None and contribute a row of NaN for each
+    of their items, with no columns when every chunk failed.
+    """
+    sent = [results for _, results in chunks if results is not None]
+    if len(chunks) == 1 and sent:
+        return sent[0]
+
+    np = numpy()
+    width = sent[0].shape[1] if sent else 0
+    fill = lambda results, size: to_array(
+        np.full((size, width), np.nan), mode
+    ) if results is None else results
+    return stack([fill(results, size) for size, results in chunks], mode)
+
+
+def expand_array(results, sent, hits, duplicates, size, cache=None, mode=True):
+    """
+    Counterpart of `expand_results` for arrays. Places the rows of `results`
+    for the `sent` (index, key) items, the cached `hits` and the
+    `duplicates` at their positions in the original batch of `size` items.
+    Rows are stored in `cache`, as lists, when one is given.
+    """
+    if cache and results is not None:
+        dense = lambda i: results[i].toarray()[0] if mode == "sparse" else results[i]
+        for i, (_, key) in enumerate(sent):
+            cache.set(key, dense(i).tolist())
+
+    hit_indices = sorted(hits)
+    width = results.shape[1] if results is not None else None
+    if hit_indices and not width:
+        # every chunk sent failed, so the width of their NaN rows is only
+        # known from the hits
+        width = len(hits[hit_indices[0]])
+        if results is not None:
+            results = to_array(numpy().full((results.shape[0], width), numpy().nan), mode)
+    parts = [to_array([hits[index] for index in hit_indices], mode, width)]
+    if results is not None:
+        parts.insert(0, results)
+
+    positions = dict((index, i) for i, (index, _) in enumerate(sent))
+    positions.update((index, len(sent) + i) for i, index in enumerate(hit_indices))
+    return stack(parts, mode)[[positions[duplicates.get(index, index)] for index in range(size)]]
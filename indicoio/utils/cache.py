@@ -0,0 +1,171 @@
+"""
+Caches for api results, keyed on the api, its arguments and the input data
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio import config, sentiment
+   >>> from indicoio.utils.cache import MemoryCache
+   >>> config.cache = MemoryCache(max_size=100000, ttl=24 * 60 * 60)
+   >>> sentiment(['Best day ever', 'Worst day ever'])
+   >>> sentiment(['Best day ever', 'Worst day ever'])  # served from the cache
+   >>> config.cache.hits, config.cache.misses
+   (2, 2)
+
+Preprocessed images can be cached the same way, with a fast memory tier in
+front of a persistent one:
+
+.. code-block:: python
+
+   >>> from indicoio.utils.cache import DiskCache, TieredCache
+   >>> config.image_cache = TieredCache(MemoryCache(1000), DiskCache("images.db"))
+"""
+import copy, json, sqlite3, threading, time
+from collections import OrderedDict
+
+
+class MemoryCache(object):
+    """
+    In-memory least recently used cache. Entries older than `ttl` seconds
+    are ignored and the least recently used entries are evicted once more
+    than `max_size` are stored. Values are copied in and out, so changes
+    made to results by callers do not reach the cache.
+    """
+
+    def __init__(self, max_size=10000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the value stored for `key`, or None
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or (self.ttl and time.time() - entry[0] > self.ttl):
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, key, value):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time(), value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+class DiskCache(object):
+    """
+    Persistent cache stored in a sqlite database at `path`, with the same
+    eviction rules as `MemoryCache`. Values must be JSON serializable.
+    """
+
+    def __init__(self, path, max_size=1000000, ttl=None):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS accessed ON results (accessed)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS created ON results (created)")
+        self._size = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key):
+        """
+        Returns the value stored for `key`, or None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        value = json.dumps(value)
+        with self._lock, self._db:
+            exists = self._db.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, value, now, now)
+            )
+            self._size += 0 if exists else 1
+            if self.ttl:
+                self._size -= self._db.execute(
+                    "DELETE FROM results WHERE created < ?", (now - self.ttl,)
+                ).rowcount
+            if self._size > self.max_size:
+                self._size -= self._db.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY accessed LIMIT ?)",
+                    (self._size - self.max_size,)
+                ).rowcount
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM results")
+            self._size = self.hits = self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class TieredCache(object):
+    """
+    Looks values up in each of `tiers` in turn, for instance a MemoryCache in
+    front of a DiskCache, copying hits into the faster tiers. Values are
+    stored in every tier.
+    """
+
+    def __init__(self, *tiers):
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+        self.hits = self.misses = 0
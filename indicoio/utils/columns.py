@@ -0,0 +1,113 @@
+"""
+Batch results of apis returning a dictionary per item (`political`,
+`text_tags`, `fer`, `language`, `named_entities`, ...) as columns, one per
+key in sorted order. The results of each request are converted as they
+arrive, so the per-item dictionaries of a large batch are never all held
+at once. Items without a key have None in its column.
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio import political
+   >>> political(texts, batch=True, columnar=True)
+   OrderedDict([(u'Conservative', [0.21, ...]), (u'Green', [...]), ...])
+   >>> political(texts, batch=True, columnar="pandas")
+      Conservative     Green   Liberal  Libertarian
+   0      0.214461  0.094583  0.466263     0.224693
+   ...
+"""
+from collections import OrderedDict
+from itertools import chain
+
+from indicoio.utils.errors import IndicoError
+
+COLUMN_MODES = (True, "numpy", "pandas", "arrow")
+
+
+def check_mode(mode):
+    if mode not in COLUMN_MODES:
+        raise IndicoError(
+            "columnar must be True or one of 'numpy', 'pandas' or 'arrow', not %r" % (mode,)
+        )
+
+
+def to_columns(results):
+    """
+    Converts a list of dictionaries to an OrderedDict of key: list of values
+    """
+    if not all(isinstance(item, dict) for item in results):
+        raise IndicoError("columnar can only be used with apis returning a dictionary per item")
+    keys = sorted(set(chain.from_iterable(results)))
+    return OrderedDict((key, [item.get(key) for item in results]) for key in keys)
+
+
+def rows(columns, count):
+    return [
+        dict((key, values[i]) for key, values in columns.items() if values[i] is not None)
+        for i in range(count)
+    ]
+
+
+def join_columns(chunks):
+    """
+    Concatenates the (size, columns) results of each chunk of a batch
+    request. Failed chunks have results of None and contribute None to every
+    column for each of their items.
+    """
+    sent = [columns for _, columns in chunks if columns is not None]
+    if len(chunks) == 1 and sent:
+        return sent[0]
+
+    keys = sorted(set(chain.from_iterable(sent)))
+    column = lambda columns, key, size: (columns or {}).get(key) or [None] * size
+    return OrderedDict(
+        (key, list(chain.from_iterable(column(columns, key, size) for size, columns in chunks)))
+        for key in keys
+    )
+
+
+def expand_columns(results, sent, hits, duplicates, size, cache=None):
+    """
+    Counterpart of `expand_results` for columns. Places the values of
+    `results` for the `sent` (index, key) items, the cached `hits` and the
+    `duplicates` at their positions in the original batch of `size` items.
+    Items are stored in `cache` as dictionaries when one is given.
+    """
+    if cache and results is not None:
+        for (_, key), item in zip(sent, rows(results, len(sent))):
+            cache.set(key, item)
+
+    hit_indices = sorted(hits)
+    results = join_columns([
+        (len(sent), results),
+        (len(hit_indices), to_columns([hits[index] for index in hit_indices])),
+    ])
+
+    positions = dict((index, i) for i, (index, _) in enumerate(sent))
+    positions.update((index, len(sent) + i) for i, index in enumerate(hit_indices))
+    order = [positions[duplicates.get(index, index)] for index in range(size)]
+    return OrderedDict((key, [values[i] for i in order]) for key, values in results.items())
+
+
+def finish_columns(columns, mode):
+    """
+    Converts columns to the structure requested by `mode`: an OrderedDict of
+    lists (True) or numpy arrays ("numpy"), a pandas DataFrame ("pandas") or
+    a pyarrow Table ("arrow").
+    """
+    if mode is True:
+        return columns
+    module = {"numpy": "numpy", "pandas": "pandas", "arrow": "pyarrow"}[mode]
+    try:
+        library = __import__(module)
+    except ImportError:
+        raise IndicoError("%s must be installed to return results as columnar=%r" % (module, mode))
+
+    if mode == "numpy":
+        return OrderedDict((key, library.asarray(values)) for key, values in columns.items())
+    if mode == "pandas":
+        return library.DataFrame(columns, columns=list(columns))
+    return library.Table.from_arrays(
+        [library.array(values) for values in columns.values()], names=list(columns)
+    )
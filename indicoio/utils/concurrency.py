@@ -0,0 +1,96 @@
+"""
+Helpers for running client work on a bounded pool of threads
+"""
+import threading, Queue
+from collections import deque
+from multiprocessing.pool import Pool, ThreadPool
+
+_POOLS = {}
+_LOCK = threading.Lock()
+
+
+def _call(func, item):
+    try:
+        return func(item), None
+    except Exception as e:
+        return None, e
+
+
+def imap_ordered(func, iterable, max_workers=1, window=None):
+    """
+    Yields an (item, result, error) triple for every item of `iterable` in
+    input order, evaluating `func` on up to `max_workers` items at a time.
+    At most `window` items (default twice `max_workers`) are read ahead of
+    the one being yielded, so long iterables are consumed lazily.
+
+    Exceptions raised by `func` are returned as `error` rather than ending
+    the iteration, so one failing item does not discard the others. Items
+    read ahead but not started when the generator is closed are skipped.
+    """
+    if not max_workers or max_workers <= 1:
+        for item in iterable:
+            result, error = _call(func, item)
+            yield item, result, error
+        return
+
+    window = max(window or 2 * max_workers, 1)
+    tasks = Queue.Queue()
+    workers = []
+    cancelled = threading.Event()
+
+    def work():
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            item, done, outcome = task
+            if not cancelled.is_set():
+                outcome.extend(_call(func, item))
+            done.set()
+
+    def collect(pending):
+        item, done, outcome = pending.popleft()
+        done.wait()
+        return item, outcome[0], outcome[1]
+
+    try:
+        pending = deque()
+        for item in iterable:
+            task = (item, threading.Event(), [])
+            pending.append(task)
+            tasks.put(task)
+            if len(workers) < min(max_workers, len(pending)):
+                worker = threading.Thread(target=work)
+                worker.daemon = True
+                worker.start()
+                workers.append(worker)
+            if len(pending) >= window:
+                yield collect(pending)
+        while pending:
+            yield collect(pending)
+    finally:
+        cancelled.set()
+        for _ in workers:
+            tasks.put(None)
+
+
+def shared_pool(workers, processes=False):
+    """
+    Returns a long lived pool of `workers` threads, or processes when
+    `processes` is set, shared by every caller asking for the same kind
+    """
+    key = (workers, processes)
+    with _LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = Pool(workers) if processes else ThreadPool(workers)
+    return pool
+
+
+def close_pools():
+    with _LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.terminate()
+        pool.join()
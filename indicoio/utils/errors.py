@@ -5,6 +5,9 @@ Contains Indico Custom Errors
 class IndicoError(ValueError):
     pass
 
+class DeadlineExceeded(IndicoError):
+    pass
+
 class DataStructureException(Exception):
     """
     If a non-accepted datastructure is passed, throws an exception
@@ -18,3 +21,40 @@ class DataStructureException(Exception):
         return """
         function %s does not accept %s, accepted types are: %s
         """ % (self.callback, self.structure, str(self.accepted))
+
+class BatchError(IndicoError):
+    """
+    Raised when some chunks of a batch request fail. `errors` maps the
+    (start, stop) item range of each failed chunk to the exception it raised
+    and `results` holds the batch results with None for every failed item.
+    `indices` maps the same ranges to the exact batch items left without a
+    result, which may skip cached items and include repeats of failed ones.
+    """
+    def __init__(self, errors, results, indices=None):
+        self.errors = errors
+        self.results = results
+        self.indices = indices
+        first = min(errors)
+        IndicoError.__init__(self,
+            "%d chunk(s) of the batch request failed, starting with items %d-%d: %s"
+            % (len(errors), first[0], first[1], errors[first])
+        )
+
+    def item_errors(self):
+        """
+        Maps the index of every batch item without a result to the error of
+        the chunk it was sent in
+        """
+        if self.indices is not None:
+            return dict(
+                (index, self.errors[chunk])
+                for chunk, indices in self.indices.items()
+                for index in indices
+            )
+        per_item = isinstance(self.results, list)
+        return dict(
+            (index, error)
+            for (start, stop), error in self.errors.items()
+            for index in range(start, stop)
+            if not per_item or self.results[index] is None
+        )
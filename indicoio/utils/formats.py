@@ -0,0 +1,49 @@
+"""
+Alternative structures for api results, requested with the `as_array` or
+`columnar` options. Each is built up as the results of each request of a
+batch arrive, see `indicoio.utils.arrays` and `indicoio.utils.columns`.
+"""
+from collections import namedtuple
+from functools import partial
+
+from indicoio.utils import arrays, columns
+from indicoio.utils.errors import IndicoError
+
+# convert: results of a request -> partial structure
+# join: [(size, partial structure or None)] -> partial structure, as `join_results`
+# expand: as `expand_results`, given a partial structure
+# finish: partial structure -> what is returned for a batch
+# single: result of a single item -> what is returned for it
+ResultFormat = namedtuple("ResultFormat", ["convert", "join", "expand", "finish", "single"])
+
+identity = lambda results: results
+
+
+def result_format(as_array=False, columnar=False, api=None):
+    """
+    Returns the ResultFormat requested by the `as_array` or `columnar`
+    options, or None for plain lists of results. `as_array` is only
+    accepted for the feature vector apis when `api` is given.
+    """
+    if as_array and columnar:
+        raise IndicoError("as_array and columnar cannot be used together")
+    if as_array:
+        arrays.check_mode(as_array, api)
+        convert = partial(arrays.to_array, mode=as_array)
+        return ResultFormat(
+            convert=convert,
+            join=partial(arrays.join_arrays, mode=as_array),
+            expand=partial(arrays.expand_array, mode=as_array),
+            finish=identity,
+            single=convert,
+        )
+    if columnar:
+        columns.check_mode(columnar)
+        return ResultFormat(
+            convert=columns.to_columns,
+            join=columns.join_columns,
+            expand=columns.expand_columns,
+            finish=partial(columns.finish_columns, mode=columnar),
+            single=identity,
+        )
+    return None
@@ -0,0 +1,138 @@
+"""
+Callbacks on the events of api calls, for feeding what the client does into
+logging or metrics, and a breakdown of where the time of calls went.
+
+Events and the keyword arguments their callbacks receive:
+
+- request_start: api, cloud, url, items, bytes_sent, encode_seconds
+- preprocess_done: images, bytes, seconds
+- response: api, cloud, url, items, status_code, bytes_received, attempts,
+  network_seconds, decode_seconds
+- retry: api, cloud, url, attempt, delay, status_code or error
+- error: api, cloud, url, items, error
+
+Each request of a batch sends its own events, from the thread sending it.
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio.utils import hooks
+   >>> hooks.on_retry(lambda **info: log.warning("retrying %(api)s", info))
+   >>> with hooks.measure() as breakdown:
+   ...     image_features(images)
+   >>> breakdown.totals()
+   Counter({'bytes_received': 8401012, 'network_seconds': 3.2, 'preprocess_seconds': 1.1, ...})
+"""
+import threading, warnings
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import partial
+
+from indicoio.utils.errors import IndicoError
+
+EVENTS = ('request_start', 'preprocess_done', 'response', 'retry', 'error')
+
+_HOOKS = dict((event, ()) for event in EVENTS)
+_LOCK = threading.Lock()
+
+
+def register(event, callback):
+    """
+    Calls `callback(**info)` on every `event`. Returns the callback, so this
+    can be used as a decorator through the `on_<event>` functions.
+    """
+    if event not in _HOOKS:
+        raise IndicoError("Unknown event '%s', expected one of %s" % (event, ", ".join(EVENTS)))
+    with _LOCK:
+        _HOOKS[event] = _HOOKS[event] + (callback,)
+    return callback
+
+
+def unregister(event, callback):
+    with _LOCK:
+        _HOOKS[event] = tuple(hook for hook in _HOOKS[event] if hook != callback)
+
+
+def clear():
+    with _LOCK:
+        for event in EVENTS:
+            _HOOKS[event] = ()
+
+
+def active(event):
+    return bool(_HOOKS[event])
+
+
+def emit(event, **info):
+    """
+    Calls the callbacks registered for `event`. Errors in callbacks are
+    turned into warnings rather than failing the api call.
+    """
+    for callback in _HOOKS[event]:
+        try:
+            callback(**info)
+        except Exception as e:
+            warnings.warn("Error in %s hook %r: %s" % (event, callback, e), RuntimeWarning)
+
+
+on_request_start = partial(register, 'request_start')
+on_preprocess_done = partial(register, 'preprocess_done')
+on_response = partial(register, 'response')
+on_retry = partial(register, 'retry')
+on_error = partial(register, 'error')
+
+
+class Breakdown(object):
+    """
+    Totals of the calls made, per (api, cloud): requests, items, retries,
+    errors, bytes sent and received, and seconds spent encoding, on the
+    network and decoding. Preprocessing is not tied to an api, and is
+    counted under (None, None) as images, image_bytes and
+    preprocess_seconds.
+    """
+
+    def __init__(self):
+        self.by_api = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def add(self, api, cloud, **values):
+        with self._lock:
+            self.by_api[(api, cloud)].update(values)
+
+    def totals(self):
+        with self._lock:
+            return sum(self.by_api.values(), Counter())
+
+    def request_start(self, api, cloud, items, bytes_sent, encode_seconds, **info):
+        self.add(api, cloud, requests=1, items=items, bytes_sent=bytes_sent,
+                 encode_seconds=encode_seconds)
+
+    def preprocess_done(self, images, bytes, seconds):
+        self.add(None, None, images=images, image_bytes=bytes, preprocess_seconds=seconds)
+
+    def response(self, api, cloud, bytes_received, network_seconds, decode_seconds, **info):
+        self.add(api, cloud, bytes_received=bytes_received, network_seconds=network_seconds,
+                 decode_seconds=decode_seconds)
+
+    def retry(self, api, cloud, **info):
+        self.add(api, cloud, retries=1)
+
+    def error(self, api, cloud, **info):
+        self.add(api, cloud, errors=1)
+
+
+@contextmanager
+def measure():
+    """
+    Yields a Breakdown of the api calls made, from any thread, until the
+    block exits
+    """
+    breakdown = Breakdown()
+    for event in EVENTS:
+        register(event, getattr(breakdown, event))
+    try:
+        yield breakdown
+    finally:
+        for event in EVENTS:
+            unregister(event, getattr(breakdown, event))
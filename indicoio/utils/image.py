@@ -2,37 +2,158 @@
 Image Utils
 Handles preprocessing images before they are sent to the server
 """
-import os.path, base64, StringIO, re, warnings
+import os.path, base64, hashlib, json, mmap, StringIO, string, time, warnings
 
 from PIL import Image
 
+from indicoio import config
 from indicoio.utils.errors import IndicoError, DataStructureException
+from indicoio.utils.concurrency import shared_pool
+from indicoio.utils.metrics import COUNTERS
+from indicoio.utils import hooks
 
-B64_PATTERN = re.compile("^([A-Za-z0-9+/]{4})*([A-Za-z0-9+/]{4}|[A-Za-z0-9+/]{3}=|[A-Za-z0-9+/]{2}==)")
+B64_CHARACTERS = string.ascii_letters + string.digits + "+/\r\n"
+# longer strings are never treated as file paths
+MAX_PATH_LENGTH = 4096
 
-def image_preprocess(image, size=None, min_axis=None, batch=False):
+IMAGE_ENCODINGS = ('PNG', 'JPEG', 'WEBP')
+
+PREPROCESS_OPTIONS = {
+    'preprocess_workers': 'workers',
+    'preprocess_processes': 'processes',
+    'image_encoding': 'encoding',
+    'image_quality': 'quality',
+    'image_cache': 'cache',
+}
+
+def preprocess_options(kwargs):
+    """
+    Pops the per call options of `image_preprocess` from an api's kwargs
+    """
+    return dict(
+        (name, kwargs.pop(option))
+        for option, name in PREPROCESS_OPTIONS.items() if option in kwargs
+    )
+
+
+def image_preprocess(image, size=None, min_axis=None, batch=False, workers=None,
+                     processes=None, encoding=None, quality=None, cache=None):
     """
     Takes an image and prepares it for sending to the api including
     resizing and image data/structure standardizing.
+
+    Images are sent in the given `encoding` (PNG, JPEG or WEBP, the lossy
+    formats at the given `quality`), defaulting to `config.image_encoding`
+    and `config.image_quality`. Base64 input is sent unchanged, as are
+    image files that need no resizing and are already in that encoding,
+    JPEG or WEBP.
+
+    Batches are preprocessed on `workers` threads, or processes when
+    `processes` is set (defaults from `config.preprocess_workers` and
+    `config.preprocess_processes`). Errors name the index of the bad image.
+
+    When a `cache` (or `config.image_cache`) is set, preprocessed images are
+    stored there keyed on their source and target geometry and encoding,
+    see `preprocessed_key`.
+    """
+    start = time.time()
+    encoding = (encoding or config.image_encoding).upper()
+    quality = quality or config.image_quality
+    cache = config.image_cache if cache is None else cache
+    if encoding not in IMAGE_ENCODINGS:
+        raise IndicoError(
+            "Image encoding must be one of %s, not '%s'" % (", ".join(IMAGE_ENCODINGS), encoding)
+        )
+    key = lambda img: preprocessed_key(img, size, min_axis, encoding, quality)
+
+    if not batch:
+        image_key = key(image) if cache else None
+        result = cache.get(image_key) if image_key else None
+        if result is None:
+            result = preprocess_single(image, size, min_axis, encoding, quality)
+            if image_key:
+                cache.set(image_key, result)
+        results = [result]
+    else:
+        workers = workers or config.preprocess_workers
+        processes = config.preprocess_processes if processes is None else processes
+        keys = [key(img) for img in image] if cache else [None] * len(image)
+        results = [cache.get(image_key) if image_key else None for image_key in keys]
+        misses = [index for index, result in enumerate(results) if result is None]
+        processed = preprocess_batch(
+            image, misses, size, min_axis, encoding, quality, workers, processes
+        )
+        for index, result in zip(misses, processed):
+            results[index] = result
+            if keys[index]:
+                cache.set(keys[index], result)
+
+    total_bytes = sum(len(result) for result in results)
+    COUNTERS.incr("images", len(results))
+    COUNTERS.incr("image_bytes", total_bytes)
+    hooks.emit('preprocess_done', images=len(results), bytes=total_bytes, seconds=time.time() - start)
+    return results if batch else results[0]
+
+
+def preprocess_batch(images, indices, size, min_axis, encoding, quality, workers, processes):
     """
-    if batch:
-        return [image_preprocess(img, batch=False) for img in image]
+    Preprocesses the images at `indices` of a batch
+    """
+    if not indices:
+        return []
+    if is_stacked_array(images):
+        if len(indices) < len(images):
+            images = images[indices]
+        frames = stacked_array_frames(images, size, min_axis)
+        tasks = ((index, frame, encoding, quality) for index, frame in zip(indices, frames))
+        return parallel_map(encode_frame, tasks, workers, processes, len(frames))
+    tasks = ((index, images[index], size, min_axis, encoding, quality) for index in indices)
+    return parallel_map(preprocess_indexed, tasks, workers, processes, len(indices))
+
 
+def preprocessed_key(image, size, min_axis, encoding, quality):
+    """
+    Cache key of a preprocessed image. Files are identified by path,
+    modification time and size, PIL images and numpy arrays by a hash of
+    their pixels. Base64 input is never cached, so has no key.
+    """
     if isinstance(image, basestring):
-        b64_str = re.sub('^data:image/.+;base64,', '', image)
-        if os.path.isfile(image):
-            # check type of element
+        if len(image) > MAX_PATH_LENGTH or not os.path.isfile(image):
+            return None
+        stat = os.stat(image)
+        source = ["file", os.path.abspath(image), stat.st_mtime, stat.st_size]
+    elif isinstance(image, Image.Image):
+        source = ["pil", image.mode, image.size, hashlib.sha1(image.tobytes()).hexdigest()]
+    elif type(image).__name__ == "ndarray":
+        source = ["array", str(image.dtype), image.shape, hashlib.sha1(image.tobytes()).hexdigest()]
+    else:
+        return None
+    return hashlib.sha1(json.dumps([source, size, min_axis, encoding, quality])).hexdigest()
+
+
+def preprocess_single(image, size=None, min_axis=None, encoding='PNG', quality=None):
+    if isinstance(image, basestring):
+        if len(image) <= MAX_PATH_LENGTH and os.path.isfile(image):
+            # only the header is read until the pixels are needed
             out_image = Image.open(image)
-        elif B64_PATTERN.match(b64_str) is not None:
+            new_size = target_size(out_image.size, size, min_axis)
+            if new_size == out_image.size:
+                # files already in the requested or a lossy format are sent as they are
+                if out_image.format in (encoding, 'JPEG', 'WEBP'):
+                    return read_base64(image)
+                return encode_image(out_image, encoding, quality)
+            return encode_image(out_image.resize(new_size), encoding, quality)
+
+        b64_str = strip_data_uri(image)
+        if is_base64(b64_str):
             return b64_str
-        else:
-            raise IndicoError("String provided must be a valid filepath or base64 encoded string")
+        raise IndicoError("String provided must be a valid filepath or base64 encoded string")
 
     elif isinstance(image, Image.Image):
         out_image = image
     elif type(image).__name__ == "ndarray": # image is from numpy/scipy
         if "float" in str(image.dtype) and image.min() >= 0 and image.max() <= 1:
-            image *= 255.
+            image = image * 255.
         try:
             out_image = Image.fromarray(image.astype("uint8"))
         except TypeError as e:
@@ -44,19 +165,157 @@ def image_preprocess(image, size=None, min_axis=None, batch=False):
     if size or min_axis:
         out_image = resize_image(out_image, size, min_axis)
 
-    # convert to base64
+    return encode_image(out_image, encoding, quality)
+
+
+def read_base64(path):
+    """
+    Base64 encodes the contents of a file without decoding it as an image
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return ""
+        contents = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return base64.b64encode(contents)
+        finally:
+            contents.close()
+
+
+def strip_data_uri(image):
+    if image.startswith('data:image/'):
+        return image[image.find(';base64,') + len(';base64,'):]
+    return image
+
+
+def is_base64(image):
+    """
+    Whether a string only contains base64 characters, with at most two
+    padding characters at its end. Line breaks are allowed.
+    """
+    try:
+        image = str(image)
+    except UnicodeEncodeError:
+        return False
+    padding = image.translate(None, B64_CHARACTERS)
+    return len(image) > len(padding) and padding in ("", "=", "==") and image.rstrip().endswith(padding)
+
+
+def encode_image(image, encoding='PNG', quality=None):
+    """
+    Encodes a PIL image as base64 in the given format. JPEG does not
+    support transparency or palettes, so those images are converted to RGB.
+    """
+    options = {}
+    if encoding != 'PNG':
+        options['quality'] = quality or config.image_quality
+    if encoding == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+
     temp_output = StringIO.StringIO()
-    out_image.save(temp_output, format='PNG')
+    try:
+        image.save(temp_output, format=encoding, **options)
+    except (KeyError, IOError) as e:
+        raise IndicoError("Could not encode image as %s: %s" % (encoding, e))
     temp_output.seek(0)
     output_s = temp_output.read()
 
     return base64.b64encode(output_s)
 
 
-def resize_image(image, size, min_axis):
+def is_stacked_array(images):
+    """
+    Batches of equally sized images may be given as a single (N, H, W, C)
+    numpy array
+    """
+    return type(images).__name__ == "ndarray" and images.ndim == 4
+
+
+def parallel_map(f, tasks, workers, processes, size=None):
+    """
+    Maps `f` over `tasks` in order, on a shared pool when `workers` > 1
+    """
+    if not workers or workers <= 1:
+        return [f(task) for task in tasks]
+    size = len(tasks) if size is None else size
+    chunksize = max(1, size // (workers * 4))
+    return shared_pool(workers, processes).map(f, tasks, chunksize)
+
+
+def preprocess_indexed(task):
+    index, image, size, min_axis, encoding, quality = task
+    try:
+        return preprocess_single(image, size, min_axis, encoding, quality)
+    except IndicoError as e:
+        raise IndicoError("Image %d: %s" % (index, e))
+
+
+def encode_frame(task):
+    index, frame, encoding, quality = task
+    try:
+        return encode_image(Image.fromarray(frame), encoding, quality)
+    except TypeError:
+        raise IndicoError("Image %d: Please ensure the numpy array is acceptable by PIL. Values must be between 0 and 1 or between 0 and 255 in greyscale, rgb, or rgba format." % index)
+    except IndicoError as e:
+        raise IndicoError("Image %d: %s" % (index, e))
+
+
+def stacked_array_frames(images, size=None, min_axis=None):
+    """
+    Prepares a stacked (N, H, W, C) numpy array of images for encoding.
+    Resizing (nearest neighbour) and scaling to uint8 are applied to the
+    whole array at once, leaving only the encoding per image. Values are
+    scaled by 255 when the whole array lies between 0 and 1.
+    """
+    if images.shape[-1] == 1:
+        images = images[..., 0]
+    scale = "float" in str(images.dtype) and images.min() >= 0 and images.max() <= 1
+
+    # resizing first means only the resized pixels are scaled and converted
+    height, width = images.shape[1:3]
+    new_width, new_height = target_size((width, height), size, min_axis)
+    if (new_width, new_height) != (width, height):
+        rows = nearest_indices(height, new_height)
+        cols = nearest_indices(width, new_width)
+        # evenly spaced indices become slices, which select without copying
+        rows_slice, cols_slice = as_slice(rows), as_slice(cols)
+        if rows_slice is None and cols_slice is None:
+            images = images[:, [[row] for row in rows], cols]
+        else:
+            images = images[:, rows_slice or rows, cols_slice or cols]
+
+    if scale:
+        images = images * 255.
+    return images.astype("uint8")
+
+
+def nearest_indices(length, new_length):
+    """
+    Source index of each position along an axis resized from `length` to
+    `new_length` by nearest neighbour sampling
+    """
+    scale = length / float(new_length)
+    return [min(int((i + 0.5) * scale), length - 1) for i in xrange(new_length)]
+
+
+def as_slice(indices):
+    """
+    Returns a slice equivalent to a list of evenly spaced increasing indices,
+    or None
+    """
+    step = indices[1] - indices[0] if len(indices) > 1 else 1
+    if step < 1 or indices != range(indices[0], indices[-1] + 1, step):
+        return None
+    return slice(indices[0], indices[-1] + 1, step)
+
+
+def target_size(current, size, min_axis):
+    """
+    Returns the (width, height) an image of size `current` is resized to
+    """
     if min_axis:
-        min_idx, other_idx = (0,1) if image.size[0] < image.size[1] else (1,0)
-        aspect = image.size[other_idx]/float(image.size[min_idx])
+        min_idx, other_idx = (0,1) if current[0] < current[1] else (1,0)
+        aspect = current[other_idx]/float(current[min_idx])
         if aspect > 10:
             warnings.warn(
                 "An aspect ratio greater than 10:1 is not recommended",
@@ -65,9 +324,15 @@ def resize_image(image, size, min_axis):
         size_arr = [0,0]
         size_arr[min_idx] = min_axis
         size_arr[other_idx] = int(min_axis * aspect)
-        image = image.resize(tuple(size_arr))
+        return tuple(size_arr)
     elif size:
-        image = image.resize(size)
+        return tuple(size)
+    return tuple(current)
+
+
+def resize_image(image, size, min_axis):
+    if size or min_axis:
+        image = image.resize(target_size(image.size, size, min_axis))
     return image
 
 
@@ -0,0 +1,311 @@
+"""
+Counters and histograms describing the work done by the client, labelled
+by api and cloud where known, with an exporter in the Prometheus text
+format.
+
+Retries, duplicates, cache hits and preprocessed images are always
+counted. `enable` also records every request (count by status, items,
+bytes sent and received, latency and errors) through the hooks of
+`indicoio.utils.hooks`.
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio.utils import metrics
+   >>> metrics.enable()
+   >>> server = metrics.serve(9100)  # http://localhost:9100/metrics
+   >>> sentiment(texts)
+   >>> metrics.snapshot()['counters']['items{api="sentiment",cloud=""}']
+   1000
+   >>> print metrics.exposition()
+   # TYPE indicoio_items_total counter
+   indicoio_items_total{api="sentiment",cloud=""} 1000
+   ...
+"""
+import itertools, re, threading, time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import Counter
+
+from indicoio.utils import hooks
+
+SHARDS = 16
+
+# classes of error messages, first match wins, so that the error label only
+# takes a few values whatever the server says
+ERROR_CLASSES = [
+    ('auth', re.compile(r"api.?key|auth|permission|forbidden", re.I)),
+    ('quota', re.compile(r"quota|rate.?limit|too many", re.I)),
+    ('unknown_api', re.compile(r"unknown api|does not include api|not found", re.I)),
+    ('invalid_response', re.compile(r"invalid response", re.I)),
+    ('deadline', re.compile(r"deadline|timed? ?out", re.I)),
+    ('bad_input', re.compile(r"input|invalid|must be|cannot|expected", re.I)),
+    ('server', re.compile(r"server|internal|unavailable", re.I)),
+]
+
+# upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def series_key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+class Sharded(object):
+    """
+    Thread safe storage split into shards, each with its own lock, picked
+    by thread so that concurrent threads rarely wait on each other
+    """
+
+    # thread idents are aligned addresses, so each thread is instead given
+    # the next shard in turn on its first update
+    _next_index = itertools.count()
+    _local = threading.local()
+
+    def __init__(self, factory):
+        self._shards = [(threading.Lock(), factory()) for _ in range(SHARDS)]
+
+    def shard_index(self):
+        index = getattr(self._local, 'index', None)
+        if index is None:
+            index = self._local.index = next(self._next_index) % SHARDS
+        return index
+
+    def shard(self):
+        return self._shards[self.shard_index()]
+
+    def shards(self):
+        return self._shards
+
+
+class Counters(Sharded):
+    """
+    Thread safe named counters, optionally labelled
+    """
+
+    def __init__(self):
+        Sharded.__init__(self, Counter)
+
+    def incr(self, name, value=1, **labels):
+        lock, counts = self.shard()
+        with lock:
+            counts[series_key(name, labels)] += value
+
+    def series(self):
+        """
+        Returns the value of every (name, labels) pair
+        """
+        totals = Counter()
+        for lock, counts in self.shards():
+            with lock:
+                totals.update(counts)
+        return dict(totals)
+
+    def get(self, name, **labels):
+        """
+        Returns the total of counter `name` over every series with `labels`
+        """
+        wanted = set(labels.items())
+        return sum(
+            value for (series, series_labels), value in self.series().items()
+            if series == name and wanted <= set(series_labels)
+        )
+
+    def snapshot(self):
+        """
+        Returns the total of every counter as a dictionary
+        """
+        totals = Counter()
+        for (name, _), value in self.series().items():
+            totals[name] += value
+        return dict(totals)
+
+    def reset(self):
+        for lock, counts in self.shards():
+            with lock:
+                counts.clear()
+
+
+class Histograms(Sharded):
+    """
+    Thread safe histograms with cumulative `buckets`, optionally labelled
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        Sharded.__init__(self, dict)
+        self.buckets = buckets
+
+    def observe(self, name, value, **labels):
+        key = series_key(name, labels)
+        lock, histograms = self.shard()
+        with lock:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def series(self):
+        """
+        Returns (bucket counts, sum, count) for every (name, labels) pair
+        """
+        merged = {}
+        for lock, histograms in self.shards():
+            with lock:
+                for key, (counts, total, count) in histograms.items():
+                    previous = merged.get(key, ([0] * len(self.buckets), 0.0, 0))
+                    merged[key] = (
+                        [a + b for a, b in zip(previous[0], counts)],
+                        previous[1] + total,
+                        previous[2] + count,
+                    )
+        return merged
+
+    def reset(self):
+        for lock, histograms in self.shards():
+            with lock:
+                histograms.clear()
+
+
+COUNTERS = Counters()
+HISTOGRAMS = Histograms()
+
+
+def error_class(error):
+    """
+    Returns the first of ERROR_CLASSES matching the message of `error`, or
+    'other'
+    """
+    message = str(error)
+    for name, pattern in ERROR_CLASSES:
+        if pattern.search(message):
+            return name
+    return 'other'
+
+
+def record_request_start(api, cloud, items, bytes_sent, **info):
+    COUNTERS.incr("items", items, api=api, cloud=cloud or "")
+    COUNTERS.incr("request_bytes", bytes_sent, api=api, cloud=cloud or "")
+
+
+def record_response(api, cloud, status_code, bytes_received, network_seconds, **info):
+    COUNTERS.incr("requests", api=api, cloud=cloud or "", status=str(status_code))
+    COUNTERS.incr("response_bytes", bytes_received, api=api, cloud=cloud or "")
+    HISTOGRAMS.observe("request_seconds", network_seconds, api=api, cloud=cloud or "")
+
+
+def record_error(api, cloud, error, **info):
+    COUNTERS.incr("errors", api=api, cloud=cloud or "", error=type(error).__name__,
+                  reason=error_class(error))
+
+
+def record_preprocess(images, bytes, seconds):
+    HISTOGRAMS.observe("preprocess_seconds", seconds)
+
+
+RECORDERS = [
+    ('request_start', record_request_start),
+    ('response', record_response),
+    ('error', record_error),
+    ('preprocess_done', record_preprocess),
+]
+
+_STARTED = [None]
+
+
+def enable():
+    """
+    Starts recording every request
+    """
+    disable()
+    for event, recorder in RECORDERS:
+        hooks.register(event, recorder)
+    _STARTED[0] = time.time()
+
+
+def disable():
+    for event, recorder in RECORDERS:
+        hooks.unregister(event, recorder)
+    _STARTED[0] = None
+
+
+def format_labels(labels):
+    return "{%s}" % ",".join(
+        '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    ) if labels else ""
+
+
+def snapshot():
+    """
+    Returns every counter and histogram, keyed by name and labels as in
+    the exposition format, and the seconds since `enable`
+    """
+    started = _STARTED[0]
+    return {
+        'counters': dict(
+            (name + format_labels(labels), value)
+            for (name, labels), value in COUNTERS.series().items()
+        ),
+        'histograms': dict(
+            (name + format_labels(labels), {
+                'buckets': dict(zip(HISTOGRAMS.buckets, counts)), 'sum': total, 'count': count
+            })
+            for (name, labels), (counts, total, count) in HISTOGRAMS.series().items()
+        ),
+        'uptime_seconds': time.time() - started if started else None,
+    }
+
+
+def exposition(prefix="indicoio_"):
+    """
+    Returns every counter and histogram in the Prometheus text format
+    """
+    lines, typed = [], set()
+    for (name, labels), value in sorted(COUNTERS.series().items()):
+        name = prefix + name + "_total"
+        if name not in typed:
+            typed.add(name)
+            lines.append("# TYPE %s counter" % name)
+        lines.append("%s%s %s" % (name, format_labels(labels), value))
+
+    for (name, labels), (counts, total, count) in sorted(HISTOGRAMS.series().items()):
+        name = prefix + name
+        if name not in typed:
+            typed.add(name)
+            lines.append("# TYPE %s histogram" % name)
+        for bound, bucket_count in zip(HISTOGRAMS.buckets, counts):
+            lines.append("%s_bucket%s %d" % (name, format_labels(labels + (("le", bound),)), bucket_count))
+        lines.append("%s_bucket%s %d" % (name, format_labels(labels + (("le", "+Inf"),)), count))
+        lines.append("%s_sum%s %s" % (name, format_labels(labels), total))
+        lines.append("%s_count%s %d" % (name, format_labels(labels), count))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        content = exposition()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host=""):
+    """
+    Serves `exposition` over HTTP on `port` from a background thread.
+    Returns the server, stopped with its `shutdown` method.
+    """
+    server = HTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,199 @@
+"""
+Local stand-in for the indico api, for measuring the client offline and
+deterministically. Results have the shape of the real apis, derived from a
+hash of each input, and the server can be made to respond slowly or to fail
+a share of requests.
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio import sentiment
+   >>> from indicoio.utils.mockserver import MockServer
+   >>> with MockServer(latency=0.05, error_rate=0.01):
+   ...     sentiment(texts)  # sent to the local server
+"""
+import hashlib, json, random, threading, time, zlib
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+from urlparse import urlparse, parse_qs
+
+from indicoio import config
+from indicoio.utils.session import close_sessions
+
+EMOTIONS = ['Angry', 'Sad', 'Neutral', 'Surprise', 'Fear', 'Happy']
+PARTIES = ['Libertarian', 'Green', 'Liberal', 'Conservative']
+LANGUAGES = ['English', 'Spanish', 'French', 'German', 'Portuguese', 'Italian']
+TAGS = ['weather', 'sports', 'politics', 'technology', 'music', 'food']
+
+# length of the feature vectors returned, overridable with `shapes`
+SHAPES = {
+    'facialfeatures': 48,
+    'imagefeatures': 2048,
+}
+
+
+def scores(item):
+    """
+    Deterministic pseudo-random numbers in [0, 1) derived from an input
+    """
+    return random.Random(hashlib.sha1(json.dumps(item)).hexdigest())
+
+
+def distribution(item, labels):
+    rng = scores(item)
+    values = [rng.random() for _ in labels]
+    total = sum(values)
+    return dict((label, value / total) for label, value in zip(labels, values))
+
+
+def features(item, length, density=1.0):
+    rng = scores(item)
+    return [rng.random() * 5 if rng.random() < density else 0.0 for _ in range(length)]
+
+
+def entities(item):
+    words = item.split() if isinstance(item, basestring) else []
+    return dict(
+        (word, {'categories': {'person': 1.0}, 'confidence': scores(word).random()})
+        for word in words if word[:1].isupper()
+    )
+
+
+def responders(shapes):
+    """
+    Returns api (as named in urls): function of an input returning a result
+    """
+    shapes = dict(SHAPES, **shapes)
+    return {
+        'sentiment': lambda item: scores(item).random(),
+        'sentimenthq': lambda item: scores(item).random(),
+        'twitterengagement': lambda item: scores(item).random(),
+        'contentfiltering': lambda item: scores(item).random(),
+        'political': lambda item: distribution(item, PARTIES),
+        'language': lambda item: distribution(item, LANGUAGES),
+        'texttags': lambda item: distribution(item, TAGS),
+        'keywords': lambda item: dict(
+            (word, scores(word).random()) for word in set(item.split()) if len(word) > 3
+        ),
+        'namedentities': entities,
+        'fer': lambda item: distribution(item, EMOTIONS),
+        'facialfeatures': lambda item: features(item, shapes['facialfeatures']),
+        'imagefeatures': lambda item: features(item, shapes['imagefeatures'], density=0.25),
+        'faciallocalization': lambda item: [{'top_left_corner': [0, 0], 'bottom_right_corner': [48, 48]}],
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        server = self.server.mock
+        url = urlparse(self.path)
+        route = [part for part in url.path.split("/") if part]
+        batch = route[-1:] == ["batch"]
+        route = route[:-1] if batch else route
+        params = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+
+        body = self.rfile.read(int(self.headers.getheader('content-length') or 0))
+        if self.headers.getheader('content-encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        server.record(self.path, len(body))
+
+        time.sleep(server.latency)
+        if server.error_rate and server.random.random() < server.error_rate:
+            return self.respond(server.error_status, {'error': 'Mock server error'})
+        try:
+            data = json.loads(body)['data']
+        except (ValueError, KeyError, TypeError):
+            return self.respond(400, {'error': 'Request body must be JSON with a data field'})
+
+        apis = params.get('apis', '').split(',')
+        if route == ['apis', 'multiapi']:
+            results = dict(
+                (api, {'results': server.results(api.replace('_', ''), data, batch)})
+                for api in apis
+            )
+        elif route == ['apis', 'intersections']:
+            results = {apis[0]: dict(
+                (label, {apis[-1]: {'mean': scores([label, data]).random()}}) for label in TAGS
+            )}
+        elif len(route) == 1 and route[0] in server.responders:
+            results = server.results(route[0], data, batch)
+        else:
+            return self.respond(404, {'error': 'Unknown api %s' % url.path})
+        self.respond(200, {'results': results})
+
+    def respond(self, status, payload):
+        content = json.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MockServer(object):
+    """
+    Serves the apis on `port` (default: any free port) of localhost from a
+    background thread. Each request is answered after `latency` seconds, and
+    a share `error_rate` of them fail with `error_status`. `shapes` overrides
+    the length of feature vectors, e.g. {'imagefeatures': 4096}.
+
+    Used as a context manager, it points `config` at the server for the
+    duration of the block. `requests` lists the (path, body size) of every
+    request received.
+    """
+
+    def __init__(self, port=0, latency=0, error_rate=0, error_status=500, shapes=None, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responders = responders(shapes or {})
+        self.random = random.Random(seed)
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadedHTTPServer(("127.0.0.1", port), MockHandler)
+        self._server.mock = self
+        self._thread = None
+        self._config = None
+
+    @property
+    def host(self):
+        return "%s:%d" % self._server.server_address
+
+    def results(self, api, data, batch):
+        respond = self.responders.get(api, lambda item: None)
+        return [respond(item) for item in data] if batch else respond(data)
+
+    def record(self, path, size):
+        with self._lock:
+            self.requests.append((path, size))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        self._config = (config.PUBLIC_API_HOST, config.url_protocol, config.cloud)
+        config.PUBLIC_API_HOST, config.url_protocol, config.cloud = self.host, "http:", None
+        close_sessions()
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        config.PUBLIC_API_HOST, config.url_protocol, config.cloud = self._config
+        close_sessions()
@@ -1,6 +1,10 @@
+import time
+
+from indicoio import config
 from indicoio.config import TEXT_APIS, IMAGE_APIS, API_NAMES
 from indicoio.utils.api import api_handler
-from indicoio.utils.image import image_preprocess
+from indicoio.utils.concurrency import imap_ordered
+from indicoio.utils.image import image_preprocess, preprocess_options
 from indicoio.utils.errors import IndicoError
 
 
@@ -19,6 +23,64 @@ def invert_dictionary(d):
 
 API_TYPES = invert_dictionary(AVAILABLE_APIS)
 
+# apis slow enough that the "auto" policy calls them separately rather than
+# letting them hold up a multiapi request
+SLOW_APIS = ['sentiment_hq', 'named_entities', 'keywords']
+
+MULTI_POLICIES = ['multiapi', 'fanout', 'auto']
+
+
+class MultiResult(dict):
+    """
+    Dictionary of api: result, along with the `errors` (api: exception) of
+    apis that failed and the `timings` (api: seconds) of the request(s)
+    behind each api's result.
+    """
+
+    def __init__(self, results=(), errors=None, timings=None):
+        dict.__init__(self, results)
+        self.errors = {} if errors is None else errors
+        self.timings = {} if timings is None else timings
+
+    def merge(self, other):
+        self.update(other)
+        self.errors.update(getattr(other, 'errors', {}))
+        self.timings.update(getattr(other, 'timings', {}))
+        return self
+
+# (size, min_axis) each image api resizes its input to
+IMAGE_GEOMETRY = {
+    'fer': ((48, 48), None),
+    'facial_features': ((48, 48), None),
+    'image_features': ((64, 64), None),
+    'content_filtering': (None, 128),
+}
+
+
+def image_geometry(api, detect=False):
+    """
+    Returns the (size, min_axis) images are sent to `api` at, (None, None)
+    for full resolution.
+    """
+    if api == 'fer' and detect:
+        return (None, None)
+    return IMAGE_GEOMETRY.get(api, (None, None))
+
+
+def shared_geometry(geometries):
+    """
+    Returns the smallest (size, min_axis) every one of `geometries` can be
+    resized down from. Full resolution is kept if any api needs it, and the
+    aspect ratio if any api resizes by the shorter axis.
+    """
+    if not geometries or any(size is None and min_axis is None for size, min_axis in geometries):
+        return (None, None)
+    sizes = [size for size, _ in geometries if size]
+    axes = [min_axis for _, min_axis in geometries if min_axis]
+    if axes:
+        return (None, max(axes + [max(size) for size in sizes]))
+    return ((max(width for width, _ in sizes), max(height for _, height in sizes)), None)
+
 
 def intersections(data, apis = None, **kwargs):
     """
@@ -46,7 +108,7 @@ def intersections(data, apis = None, **kwargs):
             "Both `apis` must accept the same kind of input to use the intersections API"
         )
 
-    cloud = kwargs.get("cloud", None)
+    cloud = kwargs.pop("cloud", None)
 
     url_params = {
         'batch': False,
@@ -64,7 +126,7 @@ def multi(data, datatype, apis, batch=False, **kwargs):
     :param datatype: String type of API request
     :param apis: List of apis to use.
     :param batch: Is this a batch request?
-    :rtype: Dictionary of api responses
+    :rtype: MultiResult dictionary of api responses
     """
     # Client side api name checking - strictly only accept func name api
     available = AVAILABLE_APIS.get(datatype)
@@ -75,9 +137,18 @@ def multi(data, datatype, apis, batch=False, **kwargs):
             % (", ".join(invalid_apis), datatype, ", ".join(available))
         )
 
-    # Convert client api names to server names before sending request
     cloud = kwargs.pop("cloud", None)
     api_key = kwargs.pop('api_key', None)
+    policy = kwargs.pop('multi_policy', None) or config.multi_policy
+    if policy not in MULTI_POLICIES:
+        raise IndicoError(
+            "multi_policy must be one of %s, not '%s'" % (", ".join(MULTI_POLICIES), policy)
+        )
+
+    if use_fanout(policy, apis, cloud or config.cloud):
+        return fanout(data, apis, cloud=cloud, batch=batch, api_key=api_key, **kwargs)
+
+    start = time.time()
     result = api_handler(
         data,
         cloud=cloud,
@@ -89,7 +160,53 @@ def multi(data, datatype, apis, batch=False, **kwargs):
         },
         **kwargs
     )
-    return handle_response(result)
+    elapsed = time.time() - start
+    return MultiResult(handle_response(result), timings=dict((api, elapsed) for api in apis))
+
+
+def use_fanout(policy, apis, cloud):
+    """
+    Whether `apis` should be requested separately rather than through the
+    multiapi endpoint. The "auto" policy does so when several apis are
+    requested and either one of them is slow or the request goes to a
+    private cloud, which may not include every api.
+    """
+    if policy != 'auto':
+        return policy == 'fanout'
+    return len(apis) > 1 and bool(cloud or set(apis) & set(SLOW_APIS))
+
+
+def fanout(data, apis, cloud=None, batch=False, api_key=None, **kwargs):
+    """
+    Calls each of `apis` separately and concurrently, returning a
+    MultiResult with the results of those that succeeded and the errors of
+    those that failed. Raises the first error if every api failed.
+
+    Like the multiapi request, each api is sent `data` as is, so images
+    must already be preprocessed.
+    """
+    timings = {}
+    url_params = {"batch": batch, "api_key": api_key}
+
+    def call(api):
+        start = time.time()
+        try:
+            return api_handler(
+                data, cloud=cloud, api=api.replace("_", ""), url_params=dict(url_params), **kwargs
+            )
+        finally:
+            timings[api] = time.time() - start
+
+    results = MultiResult(timings=timings)
+    workers = min(len(apis), config.concurrency)
+    for api, result, error in imap_ordered(call, apis, workers):
+        if error is None:
+            results[api] = result
+        else:
+            results.errors[api] = error
+    if results.errors and not results:
+        raise results.errors[apis[0]]
+    return results
 
 
 def handle_response(result):
@@ -113,11 +230,17 @@ def analyze_text(input_text, apis=TEXT_APIS, **kwargs):
        >>> language_results = results["language"]
        >>> sentiment_results = results["sentiment"]
 
+    The apis are requested together through the multiapi endpoint, or
+    separately and concurrently with `multi_policy="fanout"`, in which case
+    apis that fail are left out of the results and their errors returned in
+    its `errors`. `multi_policy="auto"` chooses between the two, see
+    `use_fanout`. Either way the results have the `timings` of each api.
+
     :param text: The text to be analyzed.
     :param apis: List of apis to use.
     :type text: str or unicode
     :type apis: list of str
-    :rtype: Dictionary of api responses
+    :rtype: MultiResult dictionary of api responses
     """
 
     cloud = kwargs.pop('cloud', None)
@@ -151,6 +274,12 @@ def analyze_image(image, apis=IMAGE_APIS, **kwargs):
        >>> fer = results["fer"]
        >>> facial_features = results["facial_features"]
 
+    Images are resized once, to the smallest geometry every selected api can
+    use (see `IMAGE_GEOMETRY`). With `image_variants=True` each distinct
+    geometry is instead sent in its own request, so no api receives a
+    larger image than it needs. `multi_policy` is handled as for
+    `analyze_text`.
+
     :param text: The text to be analyzed.
     :param apis: List of apis to use.
     :type text: str or unicode
@@ -161,16 +290,33 @@ def analyze_image(image, apis=IMAGE_APIS, **kwargs):
     cloud = kwargs.pop('cloud', None)
     batch = kwargs.pop('batch', False)
     api_key = kwargs.pop('api_key', None)
-
-    return multi(
-        data=image_preprocess(image, batch=batch),
-        datatype="image",
-        cloud=cloud,
-        batch=batch,
-        api_key=api_key,
-        apis=apis,
-        **kwargs
-    )
+    variants = kwargs.pop('image_variants', False)
+    options = preprocess_options(kwargs)
+
+    geometries = [image_geometry(api, kwargs.get('detect')) for api in apis]
+    if not variants:
+        geometries = [shared_geometry(geometries)] * len(apis)
+    groups = []
+    for api, geometry in zip(apis, geometries):
+        for group_geometry, group in groups:
+            if group_geometry == geometry:
+                group.append(api)
+                break
+        else:
+            groups.append((geometry, [api]))
+
+    results = MultiResult()
+    for (size, min_axis), group in groups:
+        results.merge(multi(
+            data=image_preprocess(image, size=size, min_axis=min_axis, batch=batch, **options),
+            datatype="image",
+            cloud=cloud,
+            batch=batch,
+            api_key=api_key,
+            apis=group,
+            **kwargs
+        ))
+    return results
 
 def parsed_response(api, response):
     result = response.get('results', False)
@@ -0,0 +1,115 @@
+"""
+Client side rate limiting, shared between threads and optionally processes
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio import config
+   >>> from indicoio.utils.ratelimit import RateLimiter
+   >>> # at most 10 requests and 500 items per second across every process on this host
+   >>> config.rate_limiter = RateLimiter(requests_per_second=10, items_per_second=500,
+   ...                                   path="/tmp/indico-ratelimit")
+"""
+import json, os, threading, time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from indicoio.utils.errors import IndicoError
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled at `rate` tokens per second up to `capacity`
+    tokens (default: one second worth). Taking more tokens than are
+    available reserves them and waits until they have been refilled, so
+    callers are served in order and the long run rate never exceeds `rate`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Blocks until `tokens` tokens are available and takes them
+        """
+        with self._lock:
+            wait = self._take(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _take(self, tokens):
+        self._tokens, self._updated = self._refill(self._tokens, self._updated)
+        self._tokens -= tokens
+        return -self._tokens / self.rate if self._tokens < 0 else 0
+
+    def _refill(self, available, updated):
+        now = time.time()
+        return min(self.capacity, available + (now - updated) * self.rate), now
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state is kept in the file at `path`, guarded by an
+    exclusive lock, so every process on the host using the same path shares
+    one budget. Requires `fcntl` (POSIX).
+    """
+
+    def __init__(self, rate, path, capacity=None):
+        if fcntl is None:
+            raise IndicoError("Sharing a rate limit between processes requires fcntl")
+        TokenBucket.__init__(self, rate, capacity)
+        self.path = path
+
+    def _take(self, tokens):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                state = json.loads(os.read(fd, 1024) or "null")
+            except ValueError:
+                state = None
+            available, updated = state or (self.capacity, time.time())
+            available, updated = self._refill(available, updated)
+            available -= tokens
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps([available, updated]))
+        finally:
+            os.close(fd)
+        return -available / self.rate if available < 0 else 0
+
+
+class RateLimiter(object):
+    """
+    Limits requests per second and/or batch items per second. When `path`
+    is given, the limits are shared by every process using that path,
+    otherwise by every thread of this process using this limiter.
+    """
+
+    def __init__(self, requests_per_second=None, items_per_second=None, path=None):
+        self.buckets = []
+        for rate, suffix in ((requests_per_second, ".requests"), (items_per_second, ".items")):
+            if rate is None:
+                self.buckets.append(None)
+            elif path:
+                self.buckets.append(FileTokenBucket(rate, path + suffix))
+            else:
+                self.buckets.append(TokenBucket(rate))
+
+    def acquire(self, items=1):
+        """
+        Blocks until a request with `items` items may be sent
+        """
+        requests, items_bucket = self.buckets
+        if requests is not None:
+            requests.acquire(1)
+        if items_bucket is not None:
+            items_bucket.acquire(items)
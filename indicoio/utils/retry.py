@@ -0,0 +1,65 @@
+"""
+Retrying of requests that fail for transient reasons
+"""
+import random, time
+from email.utils import parsedate_tz, mktime_tz
+
+from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError
+
+# 500 is left out, as the api also reports errors in its input that way
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+RETRY_EXCEPTIONS = (ConnectionError, Timeout, ChunkedEncodingError)
+
+
+class RetryPolicy(object):
+    """
+    Describes how often and how long to wait before a failed request is
+    sent again. The wait before attempt `n + 1` is `backoff * 2 ** n`
+    seconds, capped at `max_backoff`, plus up to `jitter` times that amount
+    chosen at random. A Retry-After header sent by the server takes
+    precedence when `respect_retry_after` is set.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=30, jitter=0.5,
+                 status_codes=RETRY_STATUS_CODES, exceptions=RETRY_EXCEPTIONS,
+                 respect_retry_after=True):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_codes = tuple(status_codes)
+        self.exceptions = tuple(exceptions)
+        self.respect_retry_after = respect_retry_after
+
+    def retry_status(self, response):
+        return response.status_code in self.status_codes
+
+    def delay(self, attempt, response=None):
+        """
+        Returns the number of seconds to wait after the given (zero based)
+        failed attempt
+        """
+        if response is not None and self.respect_retry_after:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay + random.uniform(0, self.jitter * delay)
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+def parse_retry_after(value):
+    """
+    Reads a Retry-After header given either in seconds or as an HTTP date
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(mktime_tz(date) - time.time(), 0)
@@ -0,0 +1,72 @@
+"""
+JSON encoding of requests and decoding of responses. The fastest installed
+of orjson, ujson and rapidjson is used, falling back to the standard library.
+Set `config.json_backend` to pick one explicitly.
+"""
+import json
+from collections import OrderedDict
+
+from indicoio import config
+from indicoio.utils.errors import IndicoError
+
+
+def _orjson():
+    import orjson
+    return orjson.dumps, orjson.loads
+
+
+def _ujson():
+    import ujson
+    # base64 images are full of slashes, which ujson escapes by default
+    return lambda obj: ujson.dumps(obj, escape_forward_slashes=False), ujson.loads
+
+
+def _rapidjson():
+    import rapidjson
+    return rapidjson.dumps, rapidjson.loads
+
+
+def _json():
+    return json.dumps, json.loads
+
+
+BACKENDS = OrderedDict([
+    ("orjson", _orjson),
+    ("ujson", _ujson),
+    ("rapidjson", _rapidjson),
+    ("json", _json),
+])
+
+_LOADED = {}
+
+
+def serializer(name=None):
+    """
+    Returns the (name, dumps, loads) of backend `name`, defaulting to
+    `config.json_backend` or else the first installed backend.
+    """
+    name = name or config.json_backend
+    if name in _LOADED:
+        return _LOADED[name]
+    if name and name not in BACKENDS:
+        raise IndicoError(
+            "Unknown json backend '%s', expected one of %s" % (name, ", ".join(BACKENDS))
+        )
+
+    for candidate in [name] if name else BACKENDS:
+        try:
+            dumps, loads = BACKENDS[candidate]()
+        except ImportError:
+            if name:
+                raise IndicoError("The '%s' json backend is not installed" % name)
+            continue
+        _LOADED[name] = (candidate, dumps, loads)
+        return _LOADED[name]
+
+
+def dumps(obj):
+    return serializer()[1](obj)
+
+
+def loads(data):
+    return serializer()[2](data)
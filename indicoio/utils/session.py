@@ -0,0 +1,81 @@
+"""
+Pooled HTTP sessions shared by every API call
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from indicoio import config
+
+_SESSIONS = {}
+_LOCK = threading.Lock()
+
+
+def create_session(pool_size=None, keep_alive=None):
+    """
+    Builds a requests session whose connection pool holds up to `pool_size`
+    keep-alive connections.
+    """
+    pool_size = pool_size or config.pool_size
+    keep_alive = config.keep_alive if keep_alive is None else keep_alive
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def api_host(cloud=None):
+    """
+    Returns the host serving requests for `cloud` (default: config.cloud),
+    or the public API when there is none
+    """
+    cloud = cloud or config.cloud
+    return "%s.indico.domains" % cloud if cloud else config.PUBLIC_API_HOST
+
+
+def session_key(host):
+    return config.url_protocol + "//%s" % host
+
+
+def get_session(host):
+    """
+    Returns the session used for requests to `host`, creating it on first use.
+    Sessions are keyed by protocol and host, so the public API and each
+    private cloud get their own connection pool.
+    """
+    key = session_key(host)
+    with _LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = _SESSIONS[key] = create_session()
+    return session
+
+
+def set_session(session, host=None):
+    """
+    Injects a session (or any object exposing `post` and `close`) to be used
+    for requests to `host` (default: the host `config` currently points at).
+    Any session previously registered for that host is closed.
+    """
+    key = session_key(host or api_host())
+    with _LOCK:
+        previous = _SESSIONS.get(key)
+        _SESSIONS[key] = session
+    if previous is not None and previous is not session:
+        previous.close()
+
+
+def close_sessions():
+    """
+    Closes every pooled session. New sessions are created on the next request.
+    """
+    with _LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+    for session in sessions:
+        session.close()
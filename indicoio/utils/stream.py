@@ -0,0 +1,60 @@
+"""
+Lazily scores iterables of any length
+"""
+from itertools import islice
+
+import indicoio
+from indicoio import config
+from indicoio.utils.concurrency import imap_ordered
+from indicoio.utils.errors import IndicoError
+
+MULTI_APIS = ["analyze_text", "analyze_image"]
+
+
+def windows(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        window = list(islice(iterator, size))
+        if not window:
+            return
+        yield window
+
+
+def stream(api, iterable, chunk_size=None, concurrency=None, **kwargs):
+    """
+    Given an api name and any iterable of inputs, lazily yields the result
+    for each input in order. Inputs are read in chunks of `chunk_size` items
+    which are sent as batch requests, up to `concurrency` at a time, and no
+    more than twice `concurrency` chunks are read ahead of the results
+    consumed, so memory use does not grow with the length of the input.
+
+    Example usage:
+
+    .. code-block:: python
+
+       >>> import indicoio
+       >>> texts = (line.strip() for line in open('tweets.txt'))
+       >>> for score in indicoio.stream('sentiment', texts, chunk_size=500, concurrency=4):
+       ...     print score
+
+    :param api: Name of the api to use, one of `config.API_NAMES`
+    :param iterable: Inputs to be analyzed
+    :rtype: Generator of api responses. For `analyze_text` and
+        `analyze_image` each response is a dictionary of api: result
+    """
+    if api not in config.API_NAMES or api == "intersections":
+        raise IndicoError("'%s' cannot be used with stream" % api)
+
+    f = getattr(indicoio, api)
+    chunk_size = chunk_size or config.chunk_size
+    send = lambda window: f(window, batch=True, **kwargs)
+
+    for window, results, error in imap_ordered(send, windows(iterable, chunk_size), concurrency):
+        if error is not None:
+            raise error
+        if api in MULTI_APIS:
+            for i in range(len(window)):
+                yield dict((name, values[i]) for name, values in results.items())
+        else:
+            for result in results:
+                yield result
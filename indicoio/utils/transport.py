@@ -0,0 +1,102 @@
+"""
+Record and replay of api traffic. A `RecordSession` wraps a real session and
+saves every response it receives. A `ReplaySession` then answers the same
+requests from the recording without any network, so runs can be compared
+exactly.
+
+Example usage:
+
+.. code-block:: python
+
+   >>> from indicoio import set_session, close_sessions, sentiment
+   >>> from indicoio.utils.transport import RecordSession, ReplaySession
+   >>> set_session(RecordSession("sentiment.json"))
+   >>> sentiment(texts)
+   >>> close_sessions()  # saves the recording
+   >>> set_session(ReplaySession("sentiment.json"))
+   >>> sentiment(texts)  # answered from the recording
+"""
+import hashlib, json, re, threading
+
+from indicoio.utils.errors import IndicoError
+from indicoio.utils.session import create_session
+
+
+def request_key(url, data):
+    """
+    Identifies a request by its url, without the api key, and a hash of its
+    body
+    """
+    url = re.sub(r"([?&])key=[^&]*&?", r"\1", url).rstrip("?&")
+    if isinstance(data, unicode):
+        data = data.encode("utf-8")
+    return "%s %s" % (url, hashlib.sha1(data or "").hexdigest())
+
+
+class RecordedResponse(object):
+    """
+    Response read back from a recording, with the parts of a
+    `requests.Response` the client uses
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class RecordSession(object):
+    """
+    Sends requests through `session` (default: a new pooled session) and
+    records each response, saving them to `path` on `save` or `close`.
+    """
+
+    def __init__(self, path, session=None):
+        self.path = path
+        self.session = session or create_session()
+        self.recording = {}
+        self._lock = threading.Lock()
+
+    def post(self, url, data=None, **kwargs):
+        response = self.session.post(url, data=data, **kwargs)
+        with self._lock:
+            self.recording[request_key(url, data)] = {
+                'status_code': response.status_code,
+                'headers': dict(response.headers),
+                'content': response.content,
+            }
+        return response
+
+    def save(self):
+        with self._lock:
+            with open(self.path, "w") as f:
+                json.dump(self.recording, f, indent=1, sort_keys=True)
+
+    def close(self):
+        self.save()
+        self.session.close()
+
+
+class ReplaySession(object):
+    """
+    Answers requests with the responses recorded at `path` by a
+    `RecordSession`. Requests that were not recorded raise IndicoError.
+    """
+
+    def __init__(self, path):
+        with open(path) as f:
+            self.recording = json.load(f)
+
+    def post(self, url, data=None, **kwargs):
+        recorded = self.recording.get(request_key(url, data))
+        if recorded is None:
+            raise IndicoError("No recorded response for %s" % url)
+        return RecordedResponse(
+            recorded['status_code'], recorded['headers'], recorded['content'].encode("utf-8")
+        )
+
+    def close(self):
+        pass
@@ -0,0 +1,46 @@
+"""
+Stand-ins for the HTTP layer so client behaviour can be tested offline
+"""
+import json
+import zlib
+
+
+class FakeResponse(object):
+
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(payload)
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession(object):
+    """
+    Records every request and answers with `responder(url, data)`, which
+    defaults to echoing the request data back as results. Gzipped request
+    bodies are decompressed, and the headers of each request kept in
+    `headers`.
+    """
+
+    def __init__(self, responder=None):
+        self.responder = responder or (lambda url, data: {'results': data['data']})
+        self.requests = []
+        self.headers = []
+        self.closed = False
+
+    def post(self, url, data=None, headers=None, **kwargs):
+        self.headers.append(headers or {})
+        if (headers or {}).get('Content-Encoding') == 'gzip':
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        body = json.loads(data)
+        self.requests.append((url, body))
+        result = self.responder(url, body)
+        if isinstance(result, FakeResponse):
+            return result
+        return FakeResponse(result)
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,65 @@
+import base64
+import os
+import StringIO
+import unittest
+
+from PIL import Image
+
+from indicoio import analyze_image
+from indicoio.utils.multi import shared_geometry
+
+from tests.fakes import FakeSession
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def image_sizes(url, data):
+    """
+    Answers a multiapi request with the size of each image sent
+    """
+    sizes = [list(Image.open(StringIO.StringIO(base64.b64decode(image))).size) for image in data['data']]
+    apis = url.split("apis=")[1].split("&")[0].split(",")
+    return {'results': dict((api, {'results': sizes}) for api in apis)}
+
+
+class TestSharedGeometry(unittest.TestCase):
+    """
+    Ensure analyze_image sends images no larger than its apis need
+    """
+
+    def setUp(self):
+        self.session = FakeSession(image_sizes)
+        self.image = os.path.join(DIR, "data", "fear.png")
+
+    def analyze(self, apis, **kwargs):
+        return analyze_image([self.image], apis=apis, api_key="key", session=self.session, **kwargs)
+
+    def test_geometry(self):
+        self.assertEqual(shared_geometry([((48, 48), None), ((64, 64), None)]), ((64, 64), None))
+        self.assertEqual(shared_geometry([((48, 48), None), (None, 128)]), (None, 128))
+        self.assertEqual(shared_geometry([((256, 256), None), (None, 128)]), (None, 256))
+        self.assertEqual(shared_geometry([((48, 48), None), (None, None)]), (None, None))
+
+    def test_resized_once(self):
+        results = self.analyze(["fer", "facial_features"])
+        self.assertEqual(results, {'fer': [[48, 48]], 'facial_features': [[48, 48]]})
+        self.assertEqual(len(self.session.requests), 1)
+
+        results = self.analyze(["fer", "image_features"])
+        self.assertEqual(results, {'fer': [[64, 64]], 'image_features': [[64, 64]]})
+
+    def test_detect_keeps_full_resolution(self):
+        size = Image.open(self.image).size
+        results = self.analyze(["fer", "facial_features"], detect=True)
+        self.assertEqual(results['facial_features'], [list(size)])
+
+    def test_variants(self):
+        results = self.analyze(["fer", "image_features", "facial_features"], image_variants=True)
+        self.assertEqual(results, {
+            'fer': [[48, 48]], 'facial_features': [[48, 48]], 'image_features': [[64, 64]]
+        })
+        self.assertEqual(len(self.session.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+
+try:
+    import numpy as np
+    import scipy.sparse
+except ImportError:
+    np = None
+
+from indicoio import image_features, facial_features, analyze_image, sentiment, political
+from indicoio.utils.cache import MemoryCache
+from indicoio.utils.errors import IndicoError, BatchError
+
+from tests.fakes import FakeSession, FakeResponse
+
+
+def features(url, data):
+    """
+    Answers with a sparse feature vector derived from the first character
+    of each image sent
+    """
+    vector = lambda image: [0.0] * 7 + [ord(image[0]) / 2.0]
+    if isinstance(data['data'], list):
+        if "fail" in data['data']:
+            return FakeResponse({'error': 'bad image'}, 400)
+        return {'results': [vector(image) for image in data['data']]}
+    return {'results': vector(data['data'])}
+
+
+@unittest.skipIf(np is None, "numpy and scipy are not installed")
+class TestArrayResults(unittest.TestCase):
+    """
+    Ensure feature vectors can be returned as numpy arrays
+    """
+
+    def setUp(self):
+        self.session = FakeSession(features)
+        self.images = ["A", "B", "C", "A", "D"]
+
+    def features(self, images, **kwargs):
+        return image_features(images, api_key="key", session=self.session, **kwargs)
+
+    def test_dense(self):
+        results = self.features(self.images, as_array=True, chunk_size=2)
+        self.assertEqual(results.dtype, np.float32)
+        self.assertEqual(results.shape, (5, 8))
+        np.testing.assert_array_equal(results, np.asarray(self.features(self.images), dtype="float32"))
+
+    def test_single(self):
+        result = facial_features("A", api_key="key", session=self.session, as_array=True)
+        self.assertEqual(result.shape, (8,))
+
+    def test_sparse(self):
+        results = self.features(self.images, as_array="sparse", chunk_size=2)
+        self.assertTrue(scipy.sparse.isspmatrix_csr(results))
+        self.assertEqual(results.nnz, 5)
+        np.testing.assert_array_equal(results.toarray(), self.features(self.images, as_array=True))
+
+    def test_cached(self):
+        cache = MemoryCache()
+        self.features(["A", "B"], cache=cache)
+        for mode in (True, "sparse"):
+            results = self.features(self.images, as_array=mode, cache=cache, chunk_size=1)
+            dense = results.toarray() if mode == "sparse" else results
+            np.testing.assert_array_equal(dense[:, -1], [32.5, 33, 33.5, 32.5, 34])
+        self.assertEqual(len(self.session.requests), 1 + 2 + 0)
+
+        cached = self.features(["A", "B"], as_array=True, cache=cache)
+        self.assertEqual(cached.shape, (2, 8))
+
+    def test_failed_chunk(self):
+        try:
+            self.features(["A", "fail", "B"], as_array=True, chunk_size=1, deduplicate=False)
+        except BatchError as e:
+            self.assertTrue(np.isnan(e.results[1]).all())
+            self.assertEqual(e.results[2, -1], 33)
+        else:
+            self.fail("BatchError not raised")
+
+    def test_failed_chunks_with_hits(self):
+        cache = MemoryCache()
+        self.features(["A"], cache=cache)
+        for mode in (True, "sparse"):
+            try:
+                self.features(["A", "fail", "fail"], as_array=mode, cache=cache, chunk_size=1,
+                              deduplicate=False)
+            except BatchError as e:
+                results = e.results.toarray() if mode == "sparse" else e.results
+                self.assertEqual(results.shape, (3, 8))
+                self.assertEqual(results[0, -1], 32.5)
+                self.assertTrue(np.isnan(results[1:]).all())
+            else:
+                self.fail("BatchError not raised")
+
+    def test_invalid(self):
+        self.assertRaises(IndicoError, self.features, self.images, as_array="csc")
+        self.assertRaises(IndicoError, analyze_image, self.images, apis=["image_features"],
+                          api_key="key", session=self.session, as_array=True)
+
+    def test_other_apis_rejected(self):
+        for kwargs in [{}, {'chunk_size': 1}]:
+            self.assertRaises(IndicoError, sentiment, ["a", "b"], api_key="key",
+                              session=self.session, as_array=True, **kwargs)
+        self.assertRaises(IndicoError, sentiment, ["a", "a"], api_key="key",
+                          session=self.session, as_array=True)
+        self.assertRaises(IndicoError, political, ["a"], api_key="key",
+                          session=self.session, as_array=True)
+        self.assertEqual(self.session.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
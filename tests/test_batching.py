@@ -0,0 +1,174 @@
+import json
+import os
+import unittest
+
+from indicoio import sentiment, analyze_text, text_tags, fer
+from indicoio.utils.api import chunk_batch, join_results
+from indicoio.utils.cache import MemoryCache
+from indicoio.utils.errors import IndicoError, BatchError
+from indicoio.utils.metrics import COUNTERS
+
+from tests.fakes import FakeSession
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def encode(data):
+    return [(index, json.dumps(item)) for index, item in enumerate(data)]
+
+
+class TestChunking(unittest.TestCase):
+    """
+    Ensure large batches are split into bounded chunks
+    """
+
+    def test_chunk_by_count(self):
+        chunks = list(chunk_batch(encode(range(10)), chunk_size=4, max_chunk_bytes=1000))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+
+    def test_chunk_by_bytes(self):
+        data = ["a" * 8] * 5
+        chunks = list(chunk_batch(encode(data), chunk_size=100, max_chunk_bytes=25))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        for chunk in chunks:
+            self.assertTrue(len("[%s]" % ",".join(encoded for _, encoded in chunk)) <= 25)
+
+    def test_oversized_item(self):
+        chunks = list(chunk_batch(encode(["a" * 50, "b"]), chunk_size=100, max_chunk_bytes=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 1])
+
+    def test_join_multi_results(self):
+        joined = join_results([
+            (2, {'sentiment': {'results': [1, 2]}, 'language': {'error': 'bad'}}),
+            (1, {'sentiment': {'results': [3]}, 'language': {'results': [4]}}),
+        ])
+        self.assertEqual(joined['sentiment'], {'results': [1, 2, 3]})
+        self.assertEqual(joined['language'], {'error': 'bad'})
+
+
+class TestChunkedRequests(unittest.TestCase):
+    """
+    Ensure chunked batch requests are reassembled in order
+    """
+
+    def test_results_in_order(self):
+        session = FakeSession()
+        data = ["text %d" % i for i in range(25)]
+        results = sentiment(data, api_key="key", session=session, chunk_size=10)
+        self.assertEqual(results, data)
+        self.assertEqual(len(session.requests), 3)
+
+    def test_extra_arguments_sent_per_chunk(self):
+        session = FakeSession()
+        text_tags(["a", "b", "c"], api_key="key", session=session, chunk_size=2, top_n=3)
+        for _, body in session.requests:
+            self.assertEqual(body['top_n'], 3)
+            self.assertNotIn('chunk_size', body)
+
+    def test_empty_batch(self):
+        session = FakeSession()
+        self.assertEqual(sentiment([], api_key="key", session=session), [])
+        self.assertEqual(len(session.requests), 1)
+
+    def test_multi_api_chunks(self):
+        responder = lambda url, body: {'results': {
+            'sentiment': {'results': [len(text) for text in body['data']]}
+        }}
+        session = FakeSession(responder)
+        results = analyze_text(
+            ["a", "bb", "ccc"], apis=["sentiment"], api_key="key",
+            session=session, chunk_size=2
+        )
+        self.assertEqual(results, {'sentiment': [1, 2, 3]})
+
+
+class TestConcurrentChunks(unittest.TestCase):
+    """
+    Ensure chunks dispatched on a worker pool keep their order and report errors
+    """
+
+    def test_results_in_order(self):
+        session = FakeSession()
+        data = ["text %d" % i for i in range(100)]
+        results = sentiment(data, api_key="key", session=session, chunk_size=7, max_workers=4)
+        self.assertEqual(results, data)
+        self.assertEqual(len(session.requests), 15)
+
+    def test_chunk_errors(self):
+        def responder(url, body):
+            if any(text.startswith("bad") for text in body['data']):
+                return {'error': 'bad input'}
+            return {'results': body['data']}
+
+        data = ["a", "b", "bad", "c", "d", "bad again"]
+        with self.assertRaises(BatchError) as context:
+            sentiment(data, api_key="key", session=FakeSession(responder), chunk_size=2, max_workers=3)
+
+        error = context.exception
+        self.assertIsInstance(error, IndicoError)
+        self.assertEqual(sorted(error.errors), [(2, 4), (4, 6)])
+        self.assertEqual(error.results, ["a", "b", None, None, None, None])
+
+    def test_item_errors(self):
+        def responder(url, body):
+            if "a" in body['data']:
+                return {'error': 'bad input'}
+            return {'results': body['data']}
+
+        cache = MemoryCache()
+        sentiment(["c"], api_key="key", session=FakeSession(), cache=cache)
+        with self.assertRaises(BatchError) as context:
+            sentiment(["a", "c", "b", "a"], api_key="key", session=FakeSession(responder),
+                      chunk_size=2, cache=cache)
+
+        error = context.exception
+        self.assertEqual(error.results, [None, "c", None, None])
+        self.assertEqual(sorted(error.item_errors()), [0, 2, 3])
+
+    def test_single_chunk_error(self):
+        session = FakeSession(lambda url, body: {'error': 'bad input'})
+        self.assertRaises(IndicoError, sentiment, ["a"], api_key="key", session=session)
+        try:
+            sentiment(["a"], api_key="key", session=session)
+        except BatchError:
+            self.fail("single chunk failures should raise the original error")
+        except IndicoError:
+            pass
+
+
+class TestDeduplication(unittest.TestCase):
+    """
+    Ensure repeated batch items are sent once and fanned back out
+    """
+
+    def setUp(self):
+        COUNTERS.reset()
+
+    def test_duplicates_sent_once(self):
+        session = FakeSession()
+        data = ["a", "b", "a", "c", "b", "a"]
+        self.assertEqual(sentiment(data, api_key="key", session=session), data)
+        self.assertEqual(session.requests[0][1]['data'], ["a", "b", "c"])
+        self.assertEqual(COUNTERS.get("duplicates"), 3)
+
+    def test_duplicate_images(self):
+        session = FakeSession()
+        image = os.path.join(DIR, "data", "48by48.png")
+        results = fer([image, image], api_key="key", session=session)
+        self.assertEqual(len(session.requests[0][1]['data']), 1)
+        self.assertEqual(results[0], results[1])
+
+    def test_multi_api(self):
+        responder = lambda url, body: {'results': {
+            'sentiment': {'results': [len(text) for text in body['data']]}
+        }}
+        session = FakeSession(responder)
+        results = analyze_text(["a", "bb", "a"], apis=["sentiment"], api_key="key", session=session)
+        self.assertEqual(results, {'sentiment': [1, 2, 1]})
+        self.assertEqual(session.requests[0][1]['data'], ["a", "bb"])
+
+    def test_disabled(self):
+        session = FakeSession()
+        sentiment(["a", "a"], api_key="key", session=session, deduplicate=False)
+        self.assertEqual(session.requests[0][1]['data'], ["a", "a"])
+        self.assertEqual(COUNTERS.get("duplicates"), 0)
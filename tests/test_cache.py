@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from indicoio import config, sentiment, text_tags, analyze_text
+from indicoio.utils.cache import MemoryCache, DiskCache
+
+from tests.fakes import FakeSession
+
+
+class CacheBehaviour(object):
+    """
+    Checks shared by every cache backend
+    """
+
+    def test_get_set(self):
+        self.assertEqual(self.cache.get("key"), None)
+        self.cache.set("key", {"a": 1})
+        self.assertEqual(self.cache.get("key"), {"a": 1})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_values_copied(self):
+        value = {"a": [1]}
+        self.cache.set("key", value)
+        value["a"].append(2)
+        self.cache.get("key")["a"].append(3)
+        self.assertEqual(self.cache.get("key"), {"a": [1]})
+
+    def test_size_eviction(self):
+        for key in "abcd":
+            self.cache.set(key, key)
+        self.cache.get("a")
+        self.cache.set("e", "e")
+        self.assertEqual(self.cache.get("b"), None)
+        self.assertEqual(self.cache.get("a"), "a")
+        self.assertEqual(self.cache.get("e"), "e")
+
+    def test_ttl(self):
+        self.cache.ttl = 0.01
+        self.cache.set("key", 1)
+        time.sleep(0.02)
+        self.assertEqual(self.cache.get("key"), None)
+
+
+class TestMemoryCache(CacheBehaviour, unittest.TestCase):
+
+    def setUp(self):
+        self.cache = MemoryCache(max_size=4)
+
+
+class TestDiskCache(CacheBehaviour, unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiskCache(os.path.join(self.directory, "cache.db"), max_size=4)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_persistence(self):
+        self.cache.set("key", [1, 2])
+        self.cache.close()
+        self.cache = DiskCache(self.cache.path, max_size=4)
+        self.assertEqual(self.cache.get("key"), [1, 2])
+
+
+class TestCachedRequests(unittest.TestCase):
+    """
+    Ensure only cache misses are sent and hits are spliced back in order
+    """
+
+    def setUp(self):
+        self.cache = MemoryCache()
+        self.session = FakeSession()
+
+    def test_single(self):
+        sentiment("a", api_key="key", session=self.session, cache=self.cache)
+        self.assertEqual(sentiment("a", api_key="key", session=self.session, cache=self.cache), "a")
+        self.assertEqual(len(self.session.requests), 1)
+
+    def test_batch_sends_misses(self):
+        sentiment(["a", "c"], api_key="key", session=self.session, cache=self.cache)
+        results = sentiment(["a", "b", "c", "d"], api_key="key", session=self.session, cache=self.cache)
+        self.assertEqual(results, ["a", "b", "c", "d"])
+        self.assertEqual(self.session.requests[-1][1]['data'], ["b", "d"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 4))
+
+    def test_all_hits(self):
+        sentiment(["a", "b"], api_key="key", session=self.session, cache=self.cache)
+        self.assertEqual(sentiment(["b", "a"], api_key="key", session=self.session, cache=self.cache), ["b", "a"])
+        self.assertEqual(len(self.session.requests), 1)
+
+    def test_results_not_shared(self):
+        session = FakeSession(lambda url, body: {'results': [{'tag': text} for text in body['data']]})
+        first = text_tags(["a"], api_key="key", session=session, cache=self.cache)
+        first[0]['tag'] = "changed"
+        results = text_tags(["a", "a"], api_key="key", session=session, cache=self.cache)
+        self.assertEqual(results, [{'tag': "a"}, {'tag': "a"}])
+        results[0]['tag'] = "changed"
+        self.assertEqual(results[1], {'tag': "a"})
+
+    def test_duplicates_not_shared(self):
+        session = FakeSession(lambda url, body: {'results': [{'tag': text} for text in body['data']]})
+        results = text_tags(["a", "a"], api_key="key", session=session)
+        results[0]['tag'] = "changed"
+        self.assertEqual(results[1], {'tag': "a"})
+
+    def test_arguments_in_key(self):
+        text_tags(["a"], api_key="key", session=self.session, cache=self.cache, top_n=1)
+        text_tags(["a"], api_key="key", session=self.session, cache=self.cache, top_n=2)
+        text_tags(["a"], api_key="key", session=self.session, cache=self.cache, cloud="mycloud")
+        self.assertEqual(len(self.session.requests), 3)
+
+    def test_global_cache(self):
+        config.cache = self.cache
+        try:
+            sentiment(["a"], api_key="key", session=self.session)
+            sentiment(["a"], api_key="key", session=self.session)
+            sentiment(["a"], api_key="key", session=self.session, cache=False)
+        finally:
+            config.cache = None
+        self.assertEqual(len(self.session.requests), 2)
+
+    def test_multi_api(self):
+        responder = lambda url, body: {'results': {
+            'sentiment': {'results': body['data']},
+            'language': {'results': [text.upper() for text in body['data']]},
+        }}
+        session = FakeSession(responder)
+        apis = ["sentiment", "language"]
+        analyze_text(["a"], apis=apis, api_key="key", session=session, cache=self.cache)
+        results = analyze_text(["a", "b"], apis=apis, api_key="key", session=session, cache=self.cache)
+        self.assertEqual(results, {'sentiment': ["a", "b"], 'language': ["A", "B"]})
+        self.assertEqual(session.requests[-1][1]['data'], ["b"])
+
+    def test_multi_api_single_and_batch(self):
+        def responder(url, body):
+            if isinstance(body['data'], list):
+                return {'results': {'sentiment': {'results': [len(text) for text in body['data']]}}}
+            return {'results': {'sentiment': {'results': len(body['data'])}}}
+        session = FakeSession(responder)
+        apis = ["sentiment"]
+        analyze = lambda data: analyze_text(data, apis=apis, api_key="key", session=session, cache=self.cache)
+
+        self.assertEqual(analyze("hi"), {'sentiment': 2})
+        self.assertEqual(analyze(["hi", "x"]), {'sentiment': [2, 1]})
+        self.assertEqual(analyze("x"), {'sentiment': 1})
+        self.assertEqual(len(session.requests), 2)
@@ -0,0 +1,100 @@
+import unittest
+from collections import OrderedDict
+
+from indicoio import political, named_entities, sentiment, analyze_text
+from indicoio.utils.cache import MemoryCache
+from indicoio.utils.errors import IndicoError, BatchError
+
+from tests.fakes import FakeSession, FakeResponse
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+def scores(url, data):
+    """
+    Answers with a dictionary per text, keyed on its words
+    """
+    if "fail" in data['data']:
+        return FakeResponse({'error': 'bad text'}, 400)
+    return {'results': [
+        dict((word, float(len(word))) for word in text.split()) for text in data['data']
+    ]}
+
+
+class TestColumnarResults(unittest.TestCase):
+    """
+    Ensure batches of dictionaries can be returned as columns
+    """
+
+    def setUp(self):
+        self.session = FakeSession(scores)
+        self.texts = ["a bb", "ccc", "a bb", "bb dddd"]
+
+    def political(self, texts, **kwargs):
+        return political(texts, api_key="key", session=self.session, **kwargs)
+
+    def test_columns(self):
+        results = self.political(self.texts, columnar=True, chunk_size=2)
+        self.assertEqual(results, OrderedDict([
+            ("a", [1, None, 1, None]),
+            ("bb", [2, None, 2, 2]),
+            ("ccc", [None, 3, None, None]),
+            ("dddd", [None, None, None, 4]),
+        ]))
+        self.assertEqual(list(results), ["a", "bb", "ccc", "dddd"])
+
+    def test_same_as_rows(self):
+        rows = self.political(self.texts)
+        columns = self.political(self.texts, columnar=True, deduplicate=False)
+        for key, values in columns.items():
+            self.assertEqual(values, [row.get(key) for row in rows])
+
+    def test_cached(self):
+        cache = MemoryCache()
+        self.political(["ccc", "a bb"], cache=cache)
+        results = self.political(self.texts, columnar=True, cache=cache)
+        self.assertEqual(results["bb"], [2, None, 2, 2])
+        self.assertEqual(len(self.session.requests), 2)
+        self.political(["bb dddd"], cache=cache)
+        self.assertEqual(len(self.session.requests), 2)
+
+    def test_failed_chunk(self):
+        try:
+            self.political(["a", "fail", "bb"], columnar=True, chunk_size=1)
+        except BatchError as e:
+            self.assertEqual(e.results, OrderedDict([("a", [1, None, None]), ("bb", [None, None, 2])]))
+        else:
+            self.fail("BatchError not raised")
+
+    @unittest.skipIf(pandas is None, "pandas is not installed")
+    def test_pandas(self):
+        frame = self.political(self.texts, columnar="pandas")
+        self.assertEqual(list(frame.columns), ["a", "bb", "ccc", "dddd"])
+        self.assertEqual(frame.shape, (4, 4))
+        self.assertEqual(list(frame["bb"].isnull()), [False, True, False, False])
+        self.assertEqual(frame["dddd"][3], 4)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow(self):
+        table = self.political(self.texts, columnar="arrow")
+        self.assertEqual(table.column_names, ["a", "bb", "ccc", "dddd"])
+        self.assertEqual(table.to_pydict()["ccc"], [None, 3, None, None])
+
+    def test_invalid(self):
+        self.assertRaises(IndicoError, self.political, self.texts, columnar="csv")
+        self.assertRaises(IndicoError, self.political, self.texts, columnar=True, as_array=True)
+        self.assertRaises(IndicoError, sentiment, ["a"], api_key="key", session=FakeSession(), columnar=True)
+        self.assertRaises(IndicoError, analyze_text, ["a"], apis=["political"], api_key="key",
+                          session=self.session, columnar=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from indicoio import config, sentiment, JSON_HEADERS
+
+from tests.fakes import FakeSession
+
+
+class TestCompression(unittest.TestCase):
+    """
+    Ensure large request bodies are gzipped when compression is enabled
+    """
+
+    def setUp(self):
+        self.session = FakeSession()
+        self.data = ["a fairly repetitive text %d" % i for i in range(100)]
+
+    def tearDown(self):
+        config.compress = False
+
+    def test_off_by_default(self):
+        self.assertEqual(sentiment(self.data, api_key="key", session=self.session), self.data)
+        self.assertNotIn('Content-Encoding', self.session.headers[0])
+        self.assertEqual(self.session.headers[0]['Accept-Encoding'], 'gzip, deflate')
+
+    def test_compressed(self):
+        results = sentiment(self.data, api_key="key", session=self.session, compress=True)
+        self.assertEqual(results, self.data)
+        self.assertEqual(self.session.headers[0]['Content-Encoding'], 'gzip')
+        self.assertEqual(self.session.headers[0]['Content-type'], JSON_HEADERS['Content-type'])
+
+    def test_threshold(self):
+        config.compress = True
+        self.assertEqual(sentiment("short", api_key="key", session=self.session), "short")
+        sentiment(self.data, api_key="key", session=self.session)
+        sentiment("short", api_key="key", session=self.session, compress_threshold=0)
+        sentiment(self.data, api_key="key", session=self.session, compress=False)
+        self.assertEqual(
+            [headers.get('Content-Encoding') for headers in self.session.headers],
+            [None, 'gzip', 'gzip', None]
+        )
+
+    def test_unicode(self):
+        text = u"caf\xe9 " * 500
+        results = sentiment(text, api_key="key", session=self.session, compress=True, language=u"fran\xe7ais")
+        self.assertEqual(results, text)
+        self.assertEqual(self.session.requests[0][1]['language'], u"fran\xe7ais")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import os
 import unittest
 import textwrap
+import warnings
 from StringIO import StringIO
 
 from indicoio import config
@@ -31,6 +32,53 @@ class TestConfigureEnv(unittest.TestCase):
         os.environ["INDICO_API_KEY"] = api_key
         assert config.SETTINGS.api_key() == api_key
 
+    def test_set_timeout_from_env_var(self):
+        """
+        Ensure connect and read timeouts are read in from environment variables
+        """
+        os.environ["INDICO_CONNECT_TIMEOUT"] = "3"
+        os.environ["INDICO_READ_TIMEOUT"] = "30.5"
+        assert config.SETTINGS.timeout() == (3, 30.5)
+
+    def test_default_timeout(self):
+        """
+        Ensure timeouts fall back to the defaults
+        """
+        assert config.SETTINGS.timeout() == config.DEFAULT_TIMEOUT
+
+    def test_no_read_timeout(self):
+        """
+        Ensure "none" disables a timeout
+        """
+        os.environ["INDICO_READ_TIMEOUT"] = "None"
+        assert config.SETTINGS.timeout() == (config.DEFAULT_TIMEOUT[0], None)
+
+    def test_invalid_numbers(self):
+        """
+        Ensure malformed numbers fall back to the defaults with a warning
+        """
+        os.environ["INDICO_CONNECT_TIMEOUT"] = "soon"
+        os.environ["INDICO_COMPRESS_LEVEL"] = "max"
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert config.SETTINGS.timeout() == config.DEFAULT_TIMEOUT
+            assert config.SETTINGS.compression() == (False,) + config.DEFAULT_COMPRESSION
+        assert len(caught) == 2
+
+    def test_set_compression_from_env_var(self):
+        """
+        Ensure request compression settings are read in from environment variables
+        """
+        os.environ["INDICO_COMPRESS"] = "true"
+        os.environ["INDICO_COMPRESS_LEVEL"] = "9"
+        assert config.SETTINGS.compression() == (True, config.DEFAULT_COMPRESSION[0], 9)
+
+    def test_default_compression(self):
+        """
+        Ensure request compression is off by default
+        """
+        assert config.SETTINGS.compression() == (False,) + config.DEFAULT_COMPRESSION
+
 
 class TestConfigurationFile(unittest.TestCase):
     """
@@ -46,6 +94,11 @@ class TestConfigurationFile(unittest.TestCase):
 
         [private_cloud]
         cloud = %s
+
+        [connection]
+        read_timeout = 45
+        compress = yes
+        compress_threshold = 100
         """ % (self.api_key, self.cloud)
 
         config_file = StringIO(textwrap.dedent(config))
@@ -64,6 +117,18 @@ class TestConfigurationFile(unittest.TestCase):
         """
         assert self.settings.api_key() == self.api_key        
 
+    def test_set_timeout_from_config_file(self):
+        """
+        Ensure timeouts are read in from file, defaulting those not given
+        """
+        assert self.settings.timeout() == (config.DEFAULT_TIMEOUT[0], 45)
+
+    def test_set_compression_from_config_file(self):
+        """
+        Ensure request compression settings are read in from file
+        """
+        assert self.settings.compression() == (True, 100, config.DEFAULT_COMPRESSION[1])
+
 
 class TestPrecedence(unittest.TestCase):
     """
@@ -0,0 +1,91 @@
+import unittest
+
+from indicoio import config, analyze_text, analyze_image
+from indicoio.utils.errors import IndicoError
+from indicoio.utils.metrics import COUNTERS
+from indicoio.utils.multi import MultiResult, use_fanout
+
+from tests.fakes import FakeSession, FakeResponse
+
+
+def responder(url, data):
+    """
+    Answers single api requests with the api name, and fails named_entities
+    """
+    api = url.split("//")[1].split("/")[1].split("?")[0]
+    if api == "apis":
+        apis = url.split("apis=")[1].split(",")
+        return {'results': dict((name, {'results': "multi " + name}) for name in apis)}
+    if api == "namedentities":
+        return FakeResponse({'error': 'namedentities is not available'}, 400)
+    return {'results': api}
+
+
+class TestFanout(unittest.TestCase):
+    """
+    Ensure multiple apis can be requested separately and merged
+    """
+
+    def setUp(self):
+        self.session = FakeSession(responder)
+
+    def tearDown(self):
+        config.multi_policy = "multiapi"
+
+    def analyze(self, apis, **kwargs):
+        return analyze_text("text", apis=apis, api_key="key", session=self.session, **kwargs)
+
+    def test_multiapi(self):
+        results = self.analyze(["sentiment", "political"])
+        self.assertEqual(results, {'sentiment': "multi sentiment", 'political': "multi political"})
+        self.assertEqual(len(self.session.requests), 1)
+        self.assertEqual(sorted(results.timings), ["political", "sentiment"])
+
+    def test_fanout(self):
+        results = self.analyze(["sentiment", "political"], multi_policy="fanout")
+        self.assertIsInstance(results, MultiResult)
+        self.assertEqual(results, {'sentiment': "sentiment", 'political': "political"})
+        self.assertEqual(len(self.session.requests), 2)
+        self.assertEqual(sorted(results.timings), ["political", "sentiment"])
+        self.assertEqual(results.errors, {})
+
+    def test_partial_results(self):
+        config.multi_policy = "fanout"
+        results = self.analyze(["sentiment", "named_entities"])
+        self.assertEqual(results, {'sentiment': "sentiment"})
+        self.assertIsInstance(results.errors['named_entities'], IndicoError)
+        self.assertIn("named_entities", results.timings)
+        self.assertRaises(IndicoError, self.analyze, ["named_entities"])
+
+    def test_auto(self):
+        self.assertFalse(use_fanout("auto", ["sentiment", "political"], None))
+        self.assertTrue(use_fanout("auto", ["sentiment", "sentiment_hq"], None))
+        self.assertTrue(use_fanout("auto", ["sentiment", "political"], "mycloud"))
+        self.assertFalse(use_fanout("auto", ["sentiment_hq"], None))
+
+        self.analyze(["sentiment", "political"], multi_policy="auto")
+        self.analyze(["sentiment", "keywords"], multi_policy="auto")
+        self.assertEqual(len(self.session.requests), 3)
+
+    def test_invalid_policy(self):
+        self.assertRaises(IndicoError, self.analyze, ["sentiment"], multi_policy="sometimes")
+
+    def test_images(self):
+        results = analyze_image(
+            ["tests/data/48by48.png"], apis=["fer", "facial_features"], api_key="key",
+            session=self.session, multi_policy="fanout"
+        )
+        self.assertEqual(results, {'fer': "fer", 'facial_features': "facialfeatures"})
+        self.assertEqual(len(self.session.requests), 2)
+
+    def test_images_preprocessed_once(self):
+        COUNTERS.reset()
+        analyze_image(
+            "tests/data/48by48.png", apis=["fer", "facial_features"], api_key="key",
+            session=self.session, multi_policy="fanout"
+        )
+        self.assertEqual(COUNTERS.get("images"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
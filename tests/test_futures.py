@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+
+from indicoio import config, futures, set_session, close_sessions
+from indicoio.utils.errors import IndicoError
+
+from tests.fakes import FakeSession
+
+
+class TestFutures(unittest.TestCase):
+    """
+    Ensure the non-blocking api mirrors the synchronous one
+    """
+
+    def setUp(self):
+        self.session = FakeSession()
+        set_session(self.session)
+
+    def tearDown(self):
+        futures.close_pool()
+        close_sessions()
+
+    def test_all_apis_available(self):
+        for api in config.API_NAMES:
+            self.assertTrue(callable(getattr(futures, api)))
+
+    def test_single(self):
+        self.assertEqual(futures.sentiment("text", api_key="key").get(5), "text")
+
+    def test_batch(self):
+        result = futures.political(["a", "b"], api_key="key")
+        self.assertEqual(result.get(5), ["a", "b"])
+        self.assertIn("/political/batch", self.session.requests[0][0])
+
+    def test_callback(self):
+        received = []
+        futures.sentiment("text", api_key="key", callback=received.append).wait(5)
+        time.sleep(0.1)
+        self.assertEqual(received, ["text"])
+
+    def test_error(self):
+        set_session(FakeSession(lambda url, body: {'error': 'bad input'}))
+        result = futures.sentiment("text", api_key="key")
+        self.assertRaises(IndicoError, result.get, 5)
+
+    def test_concurrency_limit(self):
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def responder(url, body):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            return {'results': body['data']}
+
+        set_session(FakeSession(responder))
+        futures.close_pool()
+        config.concurrency = 2
+        try:
+            results = [futures.sentiment(str(i), api_key="key") for i in range(8)]
+            self.assertEqual([result.get(5) for result in results], [str(i) for i in range(8)])
+        finally:
+            config.concurrency = 10
+        self.assertTrue(state['peak'] <= 2)
@@ -0,0 +1,108 @@
+import os
+import unittest
+import warnings
+
+from requests.exceptions import ConnectionError
+
+from indicoio import sentiment, fer
+from indicoio.utils import hooks
+from indicoio.utils.errors import IndicoError
+from indicoio.utils.retry import RetryPolicy
+from indicoio.utils.serializer import dumps
+
+from tests.fakes import FakeSession, FakeResponse
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class TestHooks(unittest.TestCase):
+    """
+    Ensure hooks are called on the events of api calls
+    """
+
+    def setUp(self):
+        self.events = []
+        for event in hooks.EVENTS:
+            hooks.register(event, lambda event=event, **info: self.events.append((event, info)))
+
+    def tearDown(self):
+        hooks.clear()
+
+    def names(self):
+        return [event for event, _ in self.events]
+
+    def test_request_events(self):
+        sentiment(["a", "b", "c"], api_key="key", session=FakeSession(), chunk_size=2)
+        self.assertEqual(self.names(), ["request_start", "response"] * 2)
+        start, response = self.events[0][1], self.events[1][1]
+        self.assertEqual((start["api"], start["cloud"], start["items"]), ("sentiment", None, 2))
+        self.assertEqual(start["bytes_sent"], len('{"data": %s}' % dumps(["a", "b"])))
+        self.assertEqual(response["status_code"], 200)
+        self.assertEqual(response["attempts"], 1)
+        self.assertEqual(response["bytes_received"], len('{"results": ["a", "b"]}'))
+
+    def test_retry_and_error(self):
+        def responder(url, data):
+            if len(self.events) < 4:
+                return FakeResponse({}, 503)
+            return FakeResponse({'error': 'bad input'}, 400)
+        policy = RetryPolicy(max_attempts=5, backoff=0, jitter=0)
+        self.assertRaises(IndicoError, sentiment, "a", api_key="key",
+                          session=FakeSession(responder), retry=policy)
+        self.assertEqual(self.names(), ["request_start", "retry", "retry", "retry", "error"])
+        self.assertEqual(self.events[1][1]["status_code"], 503)
+        self.assertEqual(self.events[3][1]["attempt"], 3)
+        self.assertEqual(str(self.events[-1][1]["error"]), "bad input")
+
+    def test_retry_on_exception(self):
+        def responder(url, data):
+            if len(self.events) < 2:
+                raise ConnectionError("refused")
+            return {'results': 0.5}
+        policy = RetryPolicy(backoff=0, jitter=0)
+        sentiment("a", api_key="key", session=FakeSession(responder), retry=policy)
+        self.assertEqual(self.names(), ["request_start", "retry", "response"])
+        self.assertIsInstance(self.events[1][1]["error"], ConnectionError)
+        self.assertEqual(self.events[2][1]["attempts"], 2)
+
+    def test_preprocess(self):
+        fer(os.path.join(DIR, "data", "64by64.png"), api_key="key", session=FakeSession())
+        self.assertEqual(self.names()[0], "preprocess_done")
+        self.assertEqual(self.events[0][1]["images"], 1)
+
+    def test_failing_hook(self):
+        hooks.on_response(lambda **info: 1 / 0)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self.assertEqual(sentiment("a", api_key="key", session=FakeSession()), "a")
+        self.assertEqual(caught[0].category, RuntimeWarning)
+
+    def test_unknown_event(self):
+        self.assertRaises(IndicoError, hooks.register, "on_everything", lambda **info: None)
+
+
+class TestBreakdown(unittest.TestCase):
+    """
+    Ensure measure totals the work of the calls made inside it
+    """
+
+    def test_breakdown(self):
+        session = FakeSession()
+        with hooks.measure() as breakdown:
+            sentiment(["a", "b", "c"], api_key="key", session=session, chunk_size=2, max_workers=2)
+            fer([os.path.join(DIR, "data", "64by64.png")], api_key="key", session=session)
+        sentiment("after", api_key="key", session=session)
+
+        totals = breakdown.totals()
+        self.assertEqual(totals["requests"], 3)
+        self.assertEqual(totals["items"], 4)
+        self.assertEqual(totals["images"], 1)
+        self.assertTrue(totals["network_seconds"] >= 0)
+        self.assertEqual(breakdown.by_api[("sentiment", None)]["items"], 3)
+        self.assertEqual(breakdown.by_api[("fer", None)]["requests"], 1)
+        for event in hooks.EVENTS:
+            self.assertFalse(hooks.active(event))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import threading
+import unittest
+import urllib2
+
+from indicoio import sentiment
+from indicoio.utils import hooks, metrics
+from indicoio.utils.cache import MemoryCache
+from indicoio.utils.errors import IndicoError
+from indicoio.utils.metrics import COUNTERS, HISTOGRAMS, Counters, Histograms
+
+from tests.fakes import FakeSession, FakeResponse
+
+
+class TestCounters(unittest.TestCase):
+    """
+    Ensure labelled counters and histograms total across threads
+    """
+
+    def test_labels(self):
+        counters = Counters()
+        counters.incr("retries", api="sentiment", cloud="")
+        counters.incr("retries", 2, api="fer", cloud="")
+        counters.incr("retries")
+        self.assertEqual(counters.get("retries"), 4)
+        self.assertEqual(counters.get("retries", api="fer"), 2)
+        self.assertEqual(counters.snapshot(), {"retries": 4})
+        counters.reset()
+        self.assertEqual(counters.get("retries"), 0)
+
+    def test_threads(self):
+        counters = Counters()
+        def count():
+            for _ in range(1000):
+                counters.incr("items", api="sentiment")
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counters.get("items", api="sentiment"), 8000)
+
+    def test_shards(self):
+        counters, indices = Counters(), set()
+        def count():
+            counters.incr("items")
+            indices.add(counters.shard_index())
+        threads = [threading.Thread(target=count) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(indices), 8)
+        self.assertEqual(counters.get("items"), 8)
+
+    def test_histogram(self):
+        histograms = Histograms(buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histograms.observe("request_seconds", value, api="sentiment")
+        counts, total, count = histograms.series()[("request_seconds", (("api", "sentiment"),))]
+        self.assertEqual(counts, [1, 2])
+        self.assertAlmostEqual(total, 5.55)
+        self.assertEqual(count, 3)
+
+
+class TestExporter(unittest.TestCase):
+    """
+    Ensure api calls are recorded and exported once metrics are enabled
+    """
+
+    def setUp(self):
+        COUNTERS.reset()
+        HISTOGRAMS.reset()
+        metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        hooks.clear()
+
+    def test_snapshot(self):
+        sentiment(["a", "b", "c"], api_key="key", session=FakeSession(), chunk_size=2)
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(counters['items{api="sentiment",cloud=""}'], 3)
+        self.assertEqual(counters['requests{api="sentiment",cloud="",status="200"}'], 2)
+        histogram = metrics.snapshot()["histograms"]['request_seconds{api="sentiment",cloud=""}']
+        self.assertEqual(histogram["count"], 2)
+
+    def test_errors(self):
+        session = FakeSession(lambda url, data: FakeResponse({'error': "Unknown api 'foo' 42"}, 400))
+        self.assertRaises(IndicoError, sentiment, "a", api_key="key", session=session)
+        self.assertEqual(COUNTERS.get("errors", error="IndicoError", reason="unknown_api"), 1)
+
+    def test_error_class(self):
+        self.assertEqual(metrics.error_class(IndicoError("Invalid API key 'abc'")), "auth")
+        self.assertEqual(metrics.error_class(IndicoError("Monthly quota used up")), "quota")
+        self.assertEqual(metrics.error_class(IndicoError("Something odd 123")), "other")
+
+    def test_cache_hits(self):
+        cache, session = MemoryCache(), FakeSession()
+        for _ in range(3):
+            sentiment("a", api_key="key", session=session, cache=cache)
+        sentiment(["a", "b"], api_key="key", session=session, cache=cache)
+        self.assertEqual(COUNTERS.get("cache_hits", api="sentiment", cloud=""), 3)
+
+    def test_disable(self):
+        metrics.disable()
+        sentiment("a", api_key="key", session=FakeSession())
+        self.assertEqual(COUNTERS.get("items"), 0)
+
+    def test_exposition(self):
+        sentiment(["a", "b"], api_key="key", session=FakeSession())
+        text = metrics.exposition()
+        self.assertIn("# TYPE indicoio_items_total counter", text)
+        self.assertIn('indicoio_items_total{api="sentiment",cloud=""} 2', text)
+        self.assertIn('indicoio_request_seconds_bucket{api="sentiment",cloud="",le="+Inf"} 1', text)
+        self.assertIn('indicoio_request_seconds_count{api="sentiment",cloud=""} 1', text)
+
+    def test_serve(self):
+        sentiment("a", api_key="key", session=FakeSession())
+        server = metrics.serve(0, "127.0.0.1")
+        try:
+            text = urllib2.urlopen("http://%s:%d/metrics" % server.server_address).read()
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('indicoio_items_total{api="sentiment",cloud=""} 1', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
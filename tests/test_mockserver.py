@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from indicoio import (
+    config, sentiment, political, fer, image_features, analyze_text, intersections,
+    set_session, close_sessions
+)
+from indicoio.utils.errors import IndicoError, BatchError
+from indicoio.utils.mockserver import MockServer
+from indicoio.utils.retry import NO_RETRY
+from indicoio.utils.transport import RecordSession, ReplaySession, request_key
+
+DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class TestMockServer(unittest.TestCase):
+    """
+    Ensure the client works end to end against the local stand-in server
+    """
+
+    def test_routes(self):
+        with MockServer() as server:
+            score = sentiment("great", api_key="key")
+            self.assertTrue(0 <= score < 1)
+            self.assertEqual(sentiment(["great", "awful", "great"], api_key="key")[2], score)
+            self.assertEqual(sorted(political("text", api_key="key")), sorted(["Libertarian", "Green", "Liberal", "Conservative"]))
+            self.assertEqual(len(fer(os.path.join(DIR, "data", "fear.png"), api_key="key")), 6)
+            self.assertEqual(len(image_features([os.path.join(DIR, "data", "fear.png")], api_key="key")[0]), 2048)
+
+            results = analyze_text(["a", "b"], apis=["sentiment", "text_tags"], api_key="key")
+            self.assertEqual(len(results["text_tags"]), 2)
+            self.assertEqual(results["sentiment"], sentiment(["a", "b"], api_key="key"))
+
+            results = intersections(["a", "b", "c"], apis=["text_tags", "sentiment"], api_key="key")
+            self.assertEqual(list(results), ["text_tags"])
+
+            paths = [path for path, _ in server.requests]
+            self.assertTrue(paths[0].startswith("/sentiment?key=key"))
+            self.assertTrue(paths[1].startswith("/sentiment/batch?"))
+
+    def test_shapes(self):
+        with MockServer(shapes={'imagefeatures': 16}):
+            features = image_features([os.path.join(DIR, "data", "fear.png")], api_key="key")
+            self.assertEqual(len(features[0]), 16)
+
+    def test_errors(self):
+        with MockServer(error_rate=1, error_status=400):
+            self.assertRaises(IndicoError, sentiment, "text", api_key="key")
+        with MockServer(error_rate=0.5, seed=1):
+            self.assertRaises(
+                BatchError, sentiment, ["text %d" % i for i in range(20)],
+                api_key="key", chunk_size=1, retry=NO_RETRY
+            )
+
+    def test_latency(self):
+        with MockServer(latency=0.05):
+            start = time.time()
+            sentiment("text", api_key="key")
+            self.assertTrue(time.time() - start >= 0.05)
+
+    def test_config_restored(self):
+        host = config.PUBLIC_API_HOST
+        with MockServer():
+            self.assertNotEqual(config.PUBLIC_API_HOST, host)
+        self.assertEqual(config.PUBLIC_API_HOST, host)
+
+
+class TestRecordReplay(unittest.TestCase):
+    """
+    Ensure recorded traffic can be replayed without a server
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "recording.json")
+
+    def tearDown(self):
+        close_sessions()
+        shutil.rmtree(self.directory)
+
+    def test_record_replay(self):
+        texts = ["good", u"caf\xe9", "bad"]
+        with MockServer():
+            set_session(RecordSession(self.path), host=config.PUBLIC_API_HOST)
+            recorded = sentiment(texts, api_key="key")
+            close_sessions()
+            host = config.PUBLIC_API_HOST
+
+        previous = config.PUBLIC_API_HOST, config.url_protocol
+        config.PUBLIC_API_HOST, config.url_protocol = host, "http:"
+        try:
+            set_session(ReplaySession(self.path), host=host)
+            self.assertEqual(sentiment(texts, api_key="other key"), recorded)
+            self.assertRaises(IndicoError, sentiment, ["unrecorded"], api_key="key")
+        finally:
+            config.PUBLIC_API_HOST, config.url_protocol = previous
+
+    def test_key_not_recorded(self):
+        self.assertEqual(
+            request_key("http://host/sentiment?key=secret&apis=a", "{}"),
+            request_key("http://host/sentiment?apis=a", "{}")
+        )
+        self.assertNotIn("secret", request_key("http://host/sentiment?key=secret", "{}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from indicoio import sentiment
+from indicoio.utils.ratelimit import TokenBucket, FileTokenBucket, RateLimiter
+
+from tests.fakes import FakeSession
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+        start = time.time()
+        for _ in range(10):
+            bucket.acquire()
+        elapsed = time.time() - start
+        self.assertTrue(0.08 <= elapsed < 0.5, elapsed)
+
+    def test_shared_between_threads(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        threads = [threading.Thread(target=bucket.acquire, args=(5,)) for _ in range(4)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(time.time() - start >= 0.18)
+
+
+class TestFileTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "bucket")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_budget_shared_through_file(self):
+        first = FileTokenBucket(rate=50, path=self.path, capacity=5)
+        second = FileTokenBucket(rate=50, path=self.path, capacity=5)
+        start = time.time()
+        for _ in range(5):
+            first.acquire()
+            second.acquire()
+        self.assertTrue(time.time() - start >= 0.08)
+
+
+class TestRateLimitedRequests(unittest.TestCase):
+
+    def test_items_per_second(self):
+        limiter = RateLimiter(items_per_second=100)
+        session = FakeSession()
+        start = time.time()
+        sentiment(["text %d" % i for i in range(120)], api_key="key", session=session,
+                  rate_limiter=limiter, chunk_size=40)
+        self.assertTrue(time.time() - start >= 0.18)
+        self.assertEqual(len(session.requests), 3)
+
+    def test_requests_per_second(self):
+        limiter = RateLimiter(requests_per_second=20)
+        start = time.time()
+        for _ in range(25):
+            sentiment("text", api_key="key", session=FakeSession(), rate_limiter=limiter)
+        self.assertTrue(time.time() - start >= 0.2)
@@ -0,0 +1,104 @@
+import time
+import unittest
+from email.utils import formatdate
+
+from requests.exceptions import ConnectionError
+
+from indicoio import sentiment
+from indicoio.utils.errors import IndicoError
+from indicoio.utils.metrics import COUNTERS
+from indicoio.utils.retry import RetryPolicy, parse_retry_after
+
+from tests.fakes import FakeSession, FakeResponse
+
+
+def flaky(failures):
+    """
+    Responder failing with each of `failures` in turn before succeeding
+    """
+    failures = list(failures)
+    def responder(url, body):
+        if failures:
+            failure = failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return failure
+        return {'results': body['data']}
+    return responder
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_exponential_backoff(self):
+        policy = RetryPolicy(backoff=1, max_backoff=5, jitter=0)
+        self.assertEqual([policy.delay(n) for n in range(4)], [1, 2, 4, 5])
+
+    def test_jitter(self):
+        policy = RetryPolicy(backoff=1, jitter=0.5)
+        for _ in range(20):
+            self.assertTrue(2 <= policy.delay(1) <= 3)
+
+    def test_retry_after(self):
+        policy = RetryPolicy(backoff=1, jitter=0)
+        response = FakeResponse({}, 429, headers={'Retry-After': '7'})
+        self.assertEqual(policy.delay(0, response), 7)
+        self.assertEqual(RetryPolicy(respect_retry_after=False, jitter=0, backoff=1).delay(0, response), 1)
+
+    def test_parse_retry_after_date(self):
+        self.assertTrue(8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10)
+        self.assertEqual(parse_retry_after("not a date"), None)
+
+
+class TestRetries(unittest.TestCase):
+    """
+    Ensure transient failures are retried at the transport layer
+    """
+
+    def setUp(self):
+        COUNTERS.reset()
+        self.policy = RetryPolicy(max_attempts=3, backoff=0)
+
+    def test_retry_status(self):
+        session = FakeSession(flaky([FakeResponse({}, 502), FakeResponse({}, 504)]))
+        self.assertEqual(sentiment("a", api_key="key", session=session, retry=self.policy), "a")
+        self.assertEqual(len(session.requests), 3)
+        self.assertEqual(COUNTERS.get("retries"), 2)
+
+    def test_retry_exception(self):
+        session = FakeSession(flaky([ConnectionError("reset")]))
+        self.assertEqual(sentiment("a", api_key="key", session=session, retry=self.policy), "a")
+
+    def test_attempts_exhausted(self):
+        session = FakeSession(flaky([ConnectionError("reset")] * 3))
+        self.assertRaises(ConnectionError, sentiment, "a", api_key="key", session=session, retry=self.policy)
+        self.assertEqual(len(session.requests), 3)
+
+    def test_invalid_response(self):
+        response = FakeResponse({}, 502)
+        response.content = "<html>Bad Gateway</html>"
+        session = FakeSession(flaky([response] * 3))
+        self.assertRaises(IndicoError, sentiment, "a", api_key="key", session=session, retry=self.policy)
+
+    def test_no_retry(self):
+        session = FakeSession(flaky([FakeResponse({'error': 'busy'}, 503)]))
+        self.assertRaises(IndicoError, sentiment, "a", api_key="key", session=session, retry=False)
+        self.assertEqual(len(session.requests), 1)
+
+    def test_server_error_not_retried_by_default(self):
+        session = FakeSession(flaky([FakeResponse({'error': 'bad input'}, 500)] * 3))
+        self.assertRaises(IndicoError, sentiment, "a", api_key="key", session=session)
+        self.assertEqual(len(session.requests), 1)
+
+    def test_private_cloud_missing_api_not_retried(self):
+        session = FakeSession(flaky([FakeResponse({}, 503)]))
+        self.assertRaises(
+            IndicoError, sentiment, "a", api_key="key", cloud="mycloud",
+            session=session, retry=self.policy
+        )
+        self.assertEqual(len(session.requests), 1)
+
+    def test_failed_chunk_retried_alone(self):
+        session = FakeSession(flaky([FakeResponse({}, 502)]))
+        results = sentiment(["a", "b", "c"], api_key="key", session=session, retry=self.policy, chunk_size=1)
+        self.assertEqual(results, ["a", "b", "c"])
+        self.assertEqual([body['data'] for _, body in session.requests], [["a"], ["a"], ["b"], ["c"]])
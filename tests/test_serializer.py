@@ -0,0 +1,57 @@
+import json
+import unittest
+
+from indicoio import config, sentiment
+from indicoio.utils import serializer
+from indicoio.utils.errors import IndicoError
+
+from tests.fakes import FakeSession
+
+
+def installed():
+    names = []
+    for name in serializer.BACKENDS:
+        try:
+            serializer.serializer(name)
+            names.append(name)
+        except IndicoError:
+            pass
+    return names
+
+
+class TestSerializer(unittest.TestCase):
+    """
+    Ensure every installed json backend encodes and decodes the same data
+    """
+
+    def tearDown(self):
+        config.json_backend = None
+
+    def test_round_trip(self):
+        data = {"data": [u"caf\xe9", "a/b+c==", 1.5, None], "apis": ["fer"]}
+        self.assertIn("json", installed())
+        for name in installed():
+            _, dumps, loads = serializer.serializer(name)
+            encoded = dumps(data)
+            self.assertEqual(json.loads(encoded), data)
+            self.assertEqual(loads(json.dumps(data)), data)
+            self.assertNotIn("\\/", encoded)
+
+    def test_default_is_first_installed(self):
+        self.assertEqual(serializer.serializer()[0], installed()[0])
+
+    def test_unknown_backend(self):
+        config.json_backend = "yaml"
+        self.assertRaises(IndicoError, serializer.dumps, [])
+
+    def test_requests_use_backend(self):
+        session = FakeSession()
+        for name in installed():
+            config.json_backend = name
+            self.assertEqual(sentiment(["a", "b"], api_key="key", session=session), ["a", "b"])
+            self.assertEqual(sentiment("a", api_key="key", session=session, language="english"), "a")
+            self.assertEqual(session.requests[-1][1], {"data": "a", "language": "english"})
+
+
+if __name__ == "__main__":
+    unittest.main()
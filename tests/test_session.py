@@ -0,0 +1,68 @@
+import unittest
+
+from indicoio import config, sentiment
+from indicoio.utils import session as sessions
+from indicoio.utils.session import get_session, set_session, close_sessions
+
+from tests.fakes import FakeSession
+
+
+class TestSessionPool(unittest.TestCase):
+    """
+    Ensure HTTP sessions are pooled per protocol and host
+    """
+
+    def tearDown(self):
+        close_sessions()
+
+    def test_session_reused_for_host(self):
+        self.assertIs(get_session("apiv2.indico.io"), get_session("apiv2.indico.io"))
+
+    def test_session_per_cloud(self):
+        self.assertIsNot(
+            get_session("apiv2.indico.io"),
+            get_session("mycloud.indico.domains")
+        )
+
+    def test_session_per_protocol(self):
+        https_session = get_session("apiv2.indico.io")
+        config.url_protocol = "http:"
+        try:
+            self.assertIsNot(https_session, get_session("apiv2.indico.io"))
+        finally:
+            config.url_protocol = "https:"
+
+    def test_pool_size(self):
+        adapter = get_session("apiv2.indico.io").get_adapter("https://apiv2.indico.io")
+        self.assertEqual(adapter._pool_maxsize, config.pool_size)
+
+    def test_close_sessions(self):
+        fake = FakeSession()
+        set_session(fake)
+        close_sessions()
+        self.assertTrue(fake.closed)
+        self.assertEqual(sessions._SESSIONS, {})
+
+    def test_injected_session_used(self):
+        fake = FakeSession()
+        set_session(fake)
+        self.assertEqual(sentiment("text", api_key="key"), "text")
+        self.assertEqual(len(fake.requests), 1)
+
+    def test_injected_session_follows_config(self):
+        fake = FakeSession()
+        cloud, config.cloud = config.cloud, "mycloud"
+        try:
+            set_session(fake)
+            self.assertEqual(sentiment("text", api_key="key"), "text")
+        finally:
+            config.cloud = cloud
+        self.assertEqual(len(fake.requests), 1)
+        self.assertIn("mycloud.indico.domains", fake.requests[0][0])
+
+    def test_per_call_session(self):
+        fake = FakeSession()
+        sentiment(["a", "b"], api_key="key", session=fake)
+        url, body = fake.requests[0]
+        self.assertEqual(body, {'data': ["a", "b"]})
+        self.assertIn("/sentiment/batch", url)
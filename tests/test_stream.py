@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from indicoio import stream
+from indicoio.utils.errors import IndicoError
+
+from tests.fakes import FakeSession
+
+
+class TestStream(unittest.TestCase):
+    """
+    Ensure iterables are scored lazily and in order
+    """
+
+    def test_generator_in_order(self):
+        session = FakeSession()
+        texts = ("text %d" % i for i in range(23))
+        results = list(stream("sentiment", texts, chunk_size=5, concurrency=3, api_key="key", session=session))
+        self.assertEqual(results, ["text %d" % i for i in range(23)])
+        self.assertEqual(len(session.requests), 5)
+        self.assertIn("/sentiment/batch", session.requests[0][0])
+
+    def test_bounded_read_ahead(self):
+        consumed = []
+        def texts():
+            for i in range(1000):
+                consumed.append(i)
+                yield "text %d" % i
+
+        results = stream("sentiment", texts(), chunk_size=10, concurrency=2, api_key="key", session=FakeSession())
+        self.assertEqual(next(results), "text 0")
+        self.assertTrue(len(consumed) <= 10 * 5)
+        results.close()
+
+    def test_close_skips_queued_chunks(self):
+        def slow(url, body):
+            if body['data'] != ["text 0"]:
+                time.sleep(0.05)
+            return {'results': body['data']}
+
+        session = FakeSession(slow)
+        texts = ("text %d" % i for i in range(100))
+        results = stream("sentiment", texts, chunk_size=1, concurrency=4, api_key="key", session=session)
+        self.assertEqual(next(results), "text 0")
+        results.close()
+        time.sleep(0.2)
+        # the first chunk and those in flight when closed, not the rest queued
+        self.assertTrue(len(session.requests) <= 1 + 4)
+
+    def test_multi_api(self):
+        responder = lambda url, body: {'results': {
+            'sentiment': {'results': [len(text) for text in body['data']]}
+        }}
+        results = stream(
+            "analyze_text", iter(["a", "bb", "ccc"]), chunk_size=2,
+            apis=["sentiment"], api_key="key", session=FakeSession(responder)
+        )
+        self.assertEqual(list(results), [{'sentiment': 1}, {'sentiment': 2}, {'sentiment': 3}])
+
+    def test_error(self):
+        session = FakeSession(lambda url, body: {'error': 'bad input'})
+        results = stream("sentiment", iter(["a"]), api_key="key", session=session)
+        self.assertRaises(IndicoError, list, results)
+
+    def test_invalid_api(self):
+        self.assertRaises(IndicoError, list, stream("intersections", []))
+        self.assertRaises(IndicoError, list, stream("nonsense", []))
@@ -0,0 +1,76 @@
+import time
+import unittest
+
+from requests.exceptions import Timeout
+
+from indicoio import config, sentiment
+from indicoio.utils.api import clip_timeout
+from indicoio.utils.errors import BatchError, DeadlineExceeded
+
+from tests.fakes import FakeSession
+
+
+class RecordingSession(FakeSession):
+    """
+    Records the timeout of every request and takes `delay` seconds per request
+    """
+
+    def __init__(self, delay=0):
+        FakeSession.__init__(self)
+        self.delay = delay
+        self.timeouts = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+        return FakeSession.post(self, url, data=data, headers=headers)
+
+
+class TestTimeouts(unittest.TestCase):
+
+    def test_default_timeout(self):
+        session = RecordingSession()
+        sentiment("a", api_key="key", session=session)
+        self.assertEqual(session.timeouts, [config.timeout])
+
+    def test_per_call_timeout(self):
+        session = RecordingSession()
+        sentiment("a", api_key="key", session=session, timeout=(1, 2))
+        self.assertEqual(session.timeouts, [(1, 2)])
+
+    def test_clip_timeout(self):
+        self.assertEqual(clip_timeout((10, None), 5), (5, 5))
+        self.assertEqual(clip_timeout((1, 60), 5), (1, 5))
+        self.assertEqual(clip_timeout(None, 5), 5)
+        self.assertEqual(clip_timeout(3, 5), 3)
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_timeout_clipped_to_deadline(self):
+        session = RecordingSession()
+        sentiment("a", api_key="key", session=session, timeout=(10, 60), deadline=2)
+        connect, read = session.timeouts[0]
+        self.assertTrue(1 < read <= 2)
+
+    def test_partial_results(self):
+        session = RecordingSession(delay=0.05)
+        data = ["text %d" % i for i in range(10)]
+        with self.assertRaises(BatchError) as context:
+            sentiment(data, api_key="key", session=session, chunk_size=2, deadline=0.12)
+
+        error = context.exception
+        self.assertEqual(error.results[:4], data[:4])
+        self.assertEqual(error.results[-2:], [None, None])
+        item_errors = error.item_errors()
+        self.assertEqual(sorted(item_errors), range(min(item_errors), 10))
+        self.assertTrue(all(isinstance(e, DeadlineExceeded) for e in item_errors.values()))
+        self.assertTrue(len(session.requests) < 5)
+
+    def test_timeout_past_deadline(self):
+        def responder(url, body):
+            raise Timeout("read timed out")
+        session = RecordingSession(delay=0.05)
+        session.responder = responder
+        self.assertRaises(DeadlineExceeded, sentiment, "a", api_key="key", session=session, deadline=0.04)
+        self.assertEqual(len(session.requests), 1)
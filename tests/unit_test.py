@@ -1,6 +1,11 @@
-from indicoio.utils.image import image_preprocess
+from indicoio.utils.image import image_preprocess, as_slice
+from indicoio.utils.cache import MemoryCache, DiskCache, TieredCache
+from indicoio import config
+from indicoio.utils.concurrency import close_pools
+from indicoio.utils.metrics import COUNTERS
+from indicoio.utils.errors import IndicoError
 from PIL import Image
-import os, unittest, base64, StringIO
+import os, unittest, base64, StringIO, tempfile, shutil
 
 DIR = os.path.dirname(os.path.realpath(__file__))
 
@@ -14,3 +19,279 @@ class ResizeTests(unittest.TestCase):
         image_string = StringIO.StringIO(base64.b64decode(resized_image))
         image = Image.open(image_string)
         self.assertEqual(image.size, (360.0, 360.0))
+
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class StackedArrayTests(unittest.TestCase):
+    """
+    test preprocessing a batch given as a single 4-D array
+    """
+    def decode(self, b64):
+        return np.asarray(Image.open(StringIO.StringIO(base64.b64decode(b64))))
+
+    def test_matches_per_image_preprocessing(self):
+        images = np.random.randint(0, 255, size=(5, 32, 32, 3)).astype("uint8")
+        stacked = image_preprocess(images, batch=True)
+        per_image = [image_preprocess(image) for image in images]
+        self.assertEqual(len(stacked), 5)
+        for stacked_image, single_image in zip(stacked, per_image):
+            np.testing.assert_array_equal(self.decode(stacked_image), self.decode(single_image))
+
+    def test_error_names_index(self):
+        images = np.zeros((2, 8, 8, 5), dtype="uint8")
+        with self.assertRaises(IndicoError) as context:
+            image_preprocess(images, batch=True)
+        self.assertTrue(str(context.exception).startswith("Image 0:"))
+
+    def test_resize(self):
+        images = np.random.random((3, 96, 64, 1))
+        resized = image_preprocess(images, size=(48, 48), batch=True)
+        self.assertEqual(self.decode(resized[0]).shape, (48, 48))
+
+    def test_resize_matches_pil_nearest(self):
+        images = np.random.randint(0, 255, size=(2, 97, 61)).astype("uint8")
+        for size in [(48, 48), (30, 200), (64, 64), (13, 7)]:
+            stacked = image_preprocess(images[..., None], size=size, batch=True)
+            expected = Image.fromarray(images[1]).resize(size, Image.NEAREST)
+            np.testing.assert_array_equal(self.decode(stacked[1]), np.asarray(expected))
+
+    def test_min_axis(self):
+        images = np.zeros((2, 64, 128, 3), dtype="uint8")
+        resized = image_preprocess(images, min_axis=32, batch=True)
+        self.assertEqual(self.decode(resized[0]).shape, (32, 64, 3))
+
+    def test_as_slice(self):
+        self.assertEqual(as_slice([1, 3, 5]), slice(1, 6, 2))
+        self.assertEqual(as_slice([0, 1, 3]), None)
+        self.assertEqual(as_slice([4]), slice(4, 5, 1))
+
+    def test_float_scaling(self):
+        images = np.ones((2, 8, 8, 3)) * 0.5
+        decoded = self.decode(image_preprocess(images, batch=True)[0])
+        self.assertEqual(decoded.max(), 127)
+        self.assertEqual(images.max(), 0.5)
+
+    def test_batch_detected(self):
+        from indicoio import fer
+        from tests.fakes import FakeSession
+        session = FakeSession()
+        results = fer(np.zeros((4, 48, 48, 1)), api_key="key", session=session)
+        self.assertEqual(len(session.requests[0][1]['data']), 1)
+        self.assertEqual(len(results), 4)
+        self.assertIn("/fer/batch", session.requests[0][0])
+
+
+class ParallelPreprocessTests(unittest.TestCase):
+    """
+    test preprocessing batches on a pool of workers
+    """
+    def setUp(self):
+        self.images = [
+            os.path.normpath(os.path.join(DIR, "data", name))
+            for name in ["48by48.png", "48by48rgb.png", "64by64.png", "fear.png"] * 3
+        ]
+
+    def tearDown(self):
+        close_pools()
+
+    def test_threads_keep_order(self):
+        serial = image_preprocess(self.images, size=(48, 48), batch=True)
+        parallel = image_preprocess(self.images, size=(48, 48), batch=True, workers=3)
+        self.assertEqual(serial, parallel)
+
+    def test_processes_keep_order(self):
+        serial = image_preprocess(self.images, min_axis=32, batch=True)
+        parallel = image_preprocess(self.images, min_axis=32, batch=True, workers=2, processes=True)
+        self.assertEqual(serial, parallel)
+
+    def test_error_index(self):
+        images = self.images[:3] + [42] + self.images[3:]
+        for workers in [1, 3]:
+            with self.assertRaises(IndicoError) as context:
+                image_preprocess(images, batch=True, workers=workers)
+            self.assertIn("Image 3", str(context.exception))
+
+    def test_api_option(self):
+        from indicoio import fer
+        from tests.fakes import FakeSession
+        session = FakeSession()
+        fer(self.images, api_key="key", session=session, preprocess_workers=2)
+        self.assertNotIn("preprocess_workers", session.requests[0][1])
+        self.assertEqual(len(session.requests[0][1]['data']), 4)
+
+
+class EncodingTests(unittest.TestCase):
+    """
+    test the selectable wire encoding of images
+    """
+    def setUp(self):
+        self.image = os.path.normpath(os.path.join(DIR, "data/48by48rgba.png"))
+
+    def decode(self, b64):
+        return Image.open(StringIO.StringIO(base64.b64decode(b64)))
+
+    def test_default_png(self):
+        self.assertEqual(self.decode(image_preprocess(self.image)).format, "PNG")
+
+    def test_jpeg(self):
+        encoded = image_preprocess(self.image, encoding="jpeg", quality=50)
+        image = self.decode(encoded)
+        self.assertEqual(image.format, "JPEG")
+        self.assertEqual(image.mode, "RGB")
+        photo = os.path.normpath(os.path.join(DIR, "data/fear.png"))
+        high = image_preprocess(photo, encoding="jpeg", quality=95)
+        low = image_preprocess(photo, encoding="jpeg", quality=10)
+        self.assertTrue(len(low) < len(high) < len(image_preprocess(photo)))
+
+    def test_global_encoding(self):
+        config.image_encoding = "JPEG"
+        try:
+            encoded = image_preprocess([self.image, self.image], batch=True)
+        finally:
+            config.image_encoding = "PNG"
+        self.assertEqual(self.decode(encoded[1]).format, "JPEG")
+
+    def test_invalid_encoding(self):
+        self.assertRaises(IndicoError, image_preprocess, self.image, encoding="GIFV")
+
+    def test_base64_unchanged(self):
+        b64 = image_preprocess(self.image)
+        self.assertEqual(image_preprocess(b64, encoding="JPEG"), b64)
+
+    def test_payload_metrics(self):
+        COUNTERS.reset()
+        encoded = image_preprocess([self.image] * 3, batch=True)
+        self.assertEqual(COUNTERS.get("images"), 3)
+        self.assertEqual(COUNTERS.get("image_bytes"), 3 * len(encoded[0]))
+
+    def test_api_option(self):
+        from indicoio import image_features
+        from tests.fakes import FakeSession
+        session = FakeSession()
+        image_features(self.image, api_key="key", session=session, image_encoding="JPEG", image_quality=70)
+        body = session.requests[0][1]
+        self.assertNotIn("image_encoding", body)
+        self.assertEqual(self.decode(body['data']).format, "JPEG")
+
+
+class PassThroughTests(unittest.TestCase):
+    """
+    test that image files needing no resizing are sent as they are
+    """
+    def path(self, name):
+        return os.path.normpath(os.path.join(DIR, "data", name))
+
+    def file_base64(self, name):
+        with open(self.path(name), "rb") as f:
+            return base64.b64encode(f.read())
+
+    def test_right_size_sent_unchanged(self):
+        self.assertEqual(image_preprocess(self.path("48by48.png"), size=(48, 48)), self.file_base64("48by48.png"))
+        self.assertEqual(image_preprocess(self.path("64by64.png"), size=(64, 64)), self.file_base64("64by64.png"))
+        self.assertEqual(image_preprocess(self.path("fear.png")), self.file_base64("fear.png"))
+
+    def test_jpeg_kept_as_jpeg(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "fear.jpg")
+            Image.open(self.path("fear.png")).convert("RGB").save(path, format="JPEG")
+            with open(path, "rb") as f:
+                self.assertEqual(image_preprocess(path), base64.b64encode(f.read()))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_wrong_size_resized(self):
+        resized = image_preprocess(self.path("64by64.png"), size=(48, 48))
+        image = Image.open(StringIO.StringIO(base64.b64decode(resized)))
+        self.assertEqual(image.size, (48, 48))
+
+    def test_batch(self):
+        paths = [self.path("48by48.png"), self.path("64by64.png")]
+        results = image_preprocess(paths, size=(48, 48), batch=True)
+        self.assertEqual(results[0], self.file_base64("48by48.png"))
+        self.assertNotEqual(results[1], self.file_base64("64by64.png"))
+
+    def test_base64_detection(self):
+        b64 = self.file_base64("48by48.png")
+        self.assertEqual(image_preprocess(b64), b64)
+        self.assertEqual(image_preprocess("data:image/png;base64," + b64), b64)
+        self.assertEqual(image_preprocess(b64[:60] + "\n" + b64[60:]), b64[:60] + "\n" + b64[60:])
+        for invalid in ["data/unhappy.png", "$bad#FI jeaf9(#0", "abc=d", "===="]:
+            self.assertRaises(IndicoError, image_preprocess, invalid)
+
+
+class ImageCacheTests(unittest.TestCase):
+    """
+    test caching of preprocessed images
+    """
+    def setUp(self):
+        self.cache = MemoryCache()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "image.png")
+        shutil.copy(os.path.join(DIR, "data", "64by64.png"), self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_file_cached_until_modified(self):
+        first = image_preprocess(self.path, size=(48, 48), cache=self.cache)
+        self.assertEqual(image_preprocess(self.path, size=(48, 48), cache=self.cache), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        image_preprocess(self.path, size=(32, 32), cache=self.cache)
+        self.assertEqual(self.cache.misses, 2)
+
+        Image.new("RGB", (64, 64), "red").save(self.path)
+        os.utime(self.path, (0, 0))
+        self.assertNotEqual(image_preprocess(self.path, size=(48, 48), cache=self.cache), first)
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_pixels_hashed(self):
+        image = Image.new("RGB", (64, 64), "red")
+        first = image_preprocess(image, size=(48, 48), cache=self.cache)
+        self.assertEqual(image_preprocess(image.copy(), size=(48, 48), cache=self.cache), first)
+        self.assertEqual(self.cache.hits, 1)
+        image_preprocess(Image.new("RGB", (64, 64), "blue"), size=(48, 48), cache=self.cache)
+        self.assertEqual(self.cache.misses, 2)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_batch_only_preprocesses_misses(self):
+        images = np.random.rand(3, 16, 16, 3)
+        first = image_preprocess(images[:2], size=(8, 8), batch=True, cache=self.cache)
+        results = image_preprocess(images, size=(8, 8), batch=True, cache=self.cache)
+        self.assertEqual(results[:2], first)
+        self.assertEqual(results, image_preprocess(images, size=(8, 8), batch=True))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 3))
+
+    def test_base64_not_cached(self):
+        with open(self.path, "rb") as f:
+            b64 = base64.b64encode(f.read())
+        self.assertEqual(image_preprocess(b64, cache=self.cache), b64)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 0))
+
+    def test_tiers(self):
+        memory = MemoryCache(max_size=1)
+        disk = DiskCache(os.path.join(self.directory, "images.db"))
+        cache = TieredCache(memory, disk)
+        first = image_preprocess(self.path, size=(48, 48), cache=cache)
+        image_preprocess(Image.new("RGB", (64, 64), "red"), size=(48, 48), cache=cache)
+        self.assertEqual(image_preprocess(self.path, size=(48, 48), cache=cache), first)
+        self.assertEqual((memory.hits, disk.hits, cache.hits), (0, 1, 1))
+        self.assertEqual(image_preprocess(self.path, size=(48, 48), cache=cache), first)
+        self.assertEqual(memory.hits, 1)
+        disk.close()
+
+    def test_config_default(self):
+        config.image_cache = self.cache
+        try:
+            image_preprocess(self.path)
+            image_preprocess(self.path)
+        finally:
+            config.image_cache = None
+        self.assertEqual(self.cache.hits, 1)